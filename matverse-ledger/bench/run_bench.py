@@ -1,36 +1,139 @@
-import argparse, json, time, os, hashlib, random
+import argparse, json, time, os, hashlib, random, shlex
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from timing import time_command
+
+METRICS = ("omega", "psi", "cvar", "latency_ms")
 
 def sha256_hex(b: bytes) -> str:
     return "0x" + hashlib.sha256(b).hexdigest()
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--out", required=True)
-    ap.add_argument("--seed", type=int, default=1337)
-    args = ap.parse_args()
-
-    random.seed(args.seed)
+def simulate(seed: int):
+    rng = random.Random(seed)
 
     # Simulação mínima: substitua pelo seu executável real depois.
     # Aqui geramos métricas estáveis por seed.
-    omega = 0.92 + (random.random()-0.5)*0.01
-    psi   = 0.89 + (random.random()-0.5)*0.02
-    cvar  = 0.04 + (random.random()-0.5)*0.01
-    latency_ms = int(40 + random.random()*20)
+    omega = 0.92 + (rng.random()-0.5)*0.01
+    psi   = 0.89 + (rng.random()-0.5)*0.02
+    cvar  = 0.04 + (rng.random()-0.5)*0.01
+    latency_ms = int(40 + rng.random()*20)
+    return omega, psi, cvar, latency_ms
+
+def run_seed(seed: int, timing: dict = None) -> dict:
+    omega, psi, cvar, latency_ms = simulate(seed)
+    if timing is not None:
+        # Latência medida substitui a simulada (mediana, arredondada p/ uint on-chain)
+        latency_ms = int(round(timing["latency_ms"]["median"]))
 
     verdict = "ACCEPT" if (omega > 0.90 and cvar < 0.06) else "REJECT"
 
     payload = {
-        "seed": args.seed,
+        "seed": seed,
         "omega": round(omega, 6),
         "psi": round(psi, 6),
         "cvar": round(cvar, 6),
         "latency_ms": latency_ms,
         "verdict": verdict,
     }
+    if timing is not None:
+        payload["timing"] = timing
 
     run_hash = sha256_hex(json.dumps(payload, sort_keys=True).encode())
     payload["run_hash"] = run_hash
+    return payload
+
+def read_seeds(path: str) -> list:
+    seeds = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                seeds.append(int(line))
+    return seeds
+
+def summarize(runs: list) -> dict:
+    summary = {"runs": len(runs), "metrics": {}}
+    if not runs:
+        summary["accept_rate"] = None
+        return summary
+    # Matriz runs x métricas: cada estatística é uma única operação numpy sobre as colunas
+    values = np.array([[r[m] for m in METRICS] for r in runs], dtype=np.float64)
+    # quantile "linear" == statistics.quantiles(method="inclusive")
+    p05, p50, p95 = np.quantile(values, [0.05, 0.50, 0.95], axis=0)
+    stats = {
+        "mean": values.mean(axis=0),
+        "stdev": values.std(axis=0, ddof=1) if len(runs) > 1 else np.zeros(len(METRICS)),
+        "min": values.min(axis=0),
+        "p05": p05,
+        "p50": p50,
+        "p95": p95,
+        "max": values.max(axis=0),
+    }
+    for i, m in enumerate(METRICS):
+        summary["metrics"][m] = {k: float(v[i]) for k, v in stats.items()}
+    accepted = np.array([r["verdict"] == "ACCEPT" for r in runs], dtype=bool)
+    summary["accept_rate"] = float(accepted.mean())
+    return summary
+
+def run_batch(seeds: list, out: str, summary_out: str, workers: int) -> dict:
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    runs = []
+    h = hashlib.sha256()
+    t0 = time.perf_counter()
+    # map preserva a ordem do arquivo de seeds; resultados são gravados assim que chegam
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(out, "w", encoding="utf-8") as f:
+        chunksize = max(1, len(seeds) // (workers * 16))
+        for payload in pool.map(run_seed, seeds, chunksize=chunksize):
+            line = json.dumps(payload, sort_keys=True) + "\n"
+            f.write(line)
+            h.update(line.encode())
+            runs.append({m: payload[m] for m in METRICS + ("verdict",)})
+
+    summary = summarize(runs)
+    summary["results"] = os.path.basename(out)
+    summary["results_sha256"] = "0x" + h.hexdigest()
+    summary["elapsed_s"] = round(time.perf_counter() - t0, 3)
+    summary["workers"] = workers
+    with open(summary_out, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, sort_keys=True)
+    return summary
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", required=True, help="JSON (seed único) ou JSONL (modo batch)")
+    ap.add_argument("--seed", type=int, default=1337)
+    ap.add_argument("--seeds-file", default=None, help="Lista de seeds (uma por linha) para o modo batch")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--summary", default=None, help="Resumo do batch (default: <out>.summary.json)")
+    ap.add_argument("--target", default=None,
+                    help="Comando a cronometrar (recebe BENCH_SEED no ambiente); sem ele, latency_ms é simulada")
+    ap.add_argument("--repeat", type=int, default=0, help="Repetições cronometradas do --target (default 30)")
+    ap.add_argument("--warmup", type=int, default=3, help="Iterações de aquecimento antes do timing")
+    args = ap.parse_args()
+
+    # Cronometrar simulate() (~µs) gravaria latency_ms=0 no payload e on-chain
+    if args.repeat > 0 and not args.target:
+        ap.error("--repeat needs --target: there is nothing real to time without it")
+    timed = args.target is not None
+    if args.seeds_file and timed:
+        ap.error("timing is single-seed only: parallel batch runs would skew the latencies")
+
+    if args.seeds_file:
+        seeds = read_seeds(args.seeds_file)
+        summary_out = args.summary or os.path.splitext(args.out)[0] + ".summary.json"
+        summary = run_batch(seeds, args.out, summary_out, max(1, args.workers))
+        print(f"bench batch: runs={summary['runs']} accept_rate={summary['accept_rate']} "
+              f"results={args.out} summary={summary_out}")
+        return
+
+    timing = None
+    if timed:
+        timing = time_command(shlex.split(args.target), args.warmup, args.repeat or 30,
+                              env={"BENCH_SEED": str(args.seed)})
+
+    payload = run_seed(args.seed, timing)
 
     os.makedirs(os.path.dirname(args.out), exist_ok=True)
     with open(args.out, "w", encoding="utf-8") as f:
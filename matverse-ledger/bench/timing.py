@@ -0,0 +1,86 @@
+"""Harness de timing para benchmarks (warm-up + N repetições cronometradas).
+
+Mede cada iteração com perf_counter_ns, registra tempo de CPU e pico de RSS e
+resume em mediana/p95/p99 com intervalos de confiança de 95% sem distribuição
+assumida (postos da binomial, aproximação normal). Os ICs não usam sorteio, então
+o run_hash pode ser recalculado a partir do payload publicado.
+"""
+import math
+import os
+import resource
+import shlex
+import subprocess
+import time
+
+Z95 = 1.959964
+
+def _rank_quantile(sorted_vals: list, q: float) -> float:
+    idx = min(len(sorted_vals) - 1, max(0, math.ceil(q * len(sorted_vals)) - 1))
+    return sorted_vals[idx]
+
+def quantile_ci(sorted_vals: list, q: float, z: float = Z95) -> list:
+    """IC do quantil q pelos postos n*q ± z*sqrt(n*q*(1-q)) (ordem-estatística)."""
+    n = len(sorted_vals)
+    half = z * math.sqrt(n * q * (1 - q))
+    lo = max(0, math.floor(n * q - half) - 1)
+    hi = min(n - 1, math.ceil(n * q + half) - 1)
+    return [sorted_vals[lo], sorted_vals[hi]]
+
+def summarize_ns(samples_ns: list) -> dict:
+    ms = sorted(x / 1e6 for x in samples_ns)
+    return {
+        "n": len(ms),
+        "mean": round(sum(ms) / len(ms), 6),
+        "min": round(ms[0], 6),
+        "max": round(ms[-1], 6),
+        "median": round(_rank_quantile(ms, 0.50), 6),
+        "p95": round(_rank_quantile(ms, 0.95), 6),
+        "p99": round(_rank_quantile(ms, 0.99), 6),
+        "median_ci95": [round(x, 6) for x in quantile_ci(ms, 0.50)],
+        "p95_ci95": [round(x, 6) for x in quantile_ci(ms, 0.95)],
+        "p99_ci95": [round(x, 6) for x in quantile_ci(ms, 0.99)],
+    }
+
+def _cpu_ns(who: int) -> int:
+    ru = resource.getrusage(who)
+    return int((ru.ru_utime + ru.ru_stime) * 1e9)
+
+def time_callable(fn, warmup: int = 3, repeat: int = 30) -> dict:
+    """Cronometra ``fn()`` no próprio processo."""
+    for _ in range(warmup):
+        fn()
+    wall, cpu = [], []
+    for _ in range(repeat):
+        c0 = time.process_time_ns()
+        t0 = time.perf_counter_ns()
+        fn()
+        wall.append(time.perf_counter_ns() - t0)
+        cpu.append(time.process_time_ns() - c0)
+    return _report("callable", warmup, wall, cpu, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+def time_command(argv: list, warmup: int = 3, repeat: int = 30, env: dict = None) -> dict:
+    """Cronometra um comando externo; CPU e RSS vêm de getrusage(RUSAGE_CHILDREN)."""
+    full_env = dict(os.environ, **(env or {}))
+    for _ in range(warmup):
+        subprocess.run(argv, check=True, env=full_env, stdout=subprocess.DEVNULL)
+    wall, cpu = [], []
+    for _ in range(repeat):
+        c0 = _cpu_ns(resource.RUSAGE_CHILDREN)
+        t0 = time.perf_counter_ns()
+        subprocess.run(argv, check=True, env=full_env, stdout=subprocess.DEVNULL)
+        wall.append(time.perf_counter_ns() - t0)
+        cpu.append(_cpu_ns(resource.RUSAGE_CHILDREN) - c0)
+    return _report(shlex.join(argv), warmup, wall, cpu, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+def _report(target: str, warmup: int, wall_ns: list, cpu_ns: list, peak_rss_kb: int) -> dict:
+    if not wall_ns:
+        raise ValueError("repeat must be >= 1")
+    return {
+        "target": target,
+        "warmup": warmup,
+        "repeat": len(wall_ns),
+        "latency_ms": summarize_ns(wall_ns),
+        "cpu_ms": summarize_ns(cpu_ns),
+        "peak_rss_kb": int(peak_rss_kb),
+        "samples_ns": list(wall_ns),
+    }
@@ -24,6 +24,9 @@ class CAPTBenchmarkFreezeStore:
             self.frozen = self.frozen[-self.max_entries :]
         return record
 
+    def freeze_many(self, payloads: list[dict]) -> list[dict]:
+        return [self.freeze(p) for p in payloads]
+
     def latest(self) -> dict | None:
         if not self.frozen:
             return None
@@ -0,0 +1,393 @@
+"""Log durável (SQLite) e encadeado por hash para congelamentos CAPT."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+
+GENESIS_HASH = "0" * 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS freezes (
+    seq INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    payload TEXT NOT NULL,
+    prev_hash TEXT NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_freezes_ts ON freezes(ts);
+CREATE TABLE IF NOT EXISTS freeze_keys (
+    key TEXT NOT NULL,
+    value TEXT,
+    seq INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_freeze_keys ON freeze_keys(key, value, seq);
+CREATE TABLE IF NOT EXISTS freeze_meta (
+    k TEXT PRIMARY KEY,
+    v TEXT NOT NULL
+);
+"""
+
+
+class FreezeStoreUnavailable(RuntimeError):
+    """O lote não foi commitado (escritora falhando, timeout ou store fechado): nenhum recibo é emitido."""
+
+
+def record_hash(prev_hash: str, seq: int, ts: float, payload_json: str) -> str:
+    return hashlib.sha256(f"{prev_hash}|{seq}|{ts!r}|{payload_json}".encode("utf-8")).hexdigest()
+
+
+def _key_rows(seq: int, payload: dict) -> list[tuple[str, str | None, int]]:
+    rows = []
+    for key, value in payload.items():
+        if isinstance(value, str):
+            text = value
+        elif value is None or isinstance(value, (bool, int, float)):
+            text = json.dumps(value)
+        else:
+            text = None
+        rows.append((str(key), text, seq))
+    return rows
+
+
+@dataclass
+class DurableBenchmarkFreezeStore:
+    """Congelamentos persistidos em SQLite (WAL) com group commit.
+
+    ``freeze_many()`` calcula o encadeamento (``hash = H(prev_hash|seq|ts|payload)``)
+    sob um lock, enfileira os registros e espera o commit do lote que os contém: uma
+    thread escritora agrupa até ``batch_size`` registros ou ``commit_interval`` segundos
+    por transação, de modo que requests concorrentes dividem um único fsync. Nenhum
+    recibo (``seq``/``hash``) sai antes de estar no disco, então um crash não reemite
+    um ``seq`` já entregue com outro hash.
+
+    Um lote que falha é repetido com backoff; enquanto isso ``freeze_many`` levanta
+    ``FreezeStoreUnavailable`` (e quem espera há mais de ``commit_timeout`` também).
+    Com ``retention`` (segundos), a escritora roda ``compact()`` a cada
+    ``compact_interval``: remove o prefixo antigo do log e guarda o hash do último
+    registro removido como âncora da cadeia.
+    """
+
+    path: str
+    batch_size: int = 512
+    commit_interval: float = 0.05
+    max_backoff: float = 5.0
+    commit_timeout: float = 30.0
+    retention: float | None = None
+    compact_interval: float = 3600.0
+    write_failures: int = field(default=0, init=False)
+    consecutive_failures: int = field(default=0, init=False)
+    last_error: str | None = field(default=None, init=False)
+    last_failure_at: float | None = field(default=None, init=False)
+    last_compaction: dict | None = field(default=None, init=False)
+    _abandon: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+    _queue: queue.Queue = field(default_factory=queue.Queue, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _seq: int = field(default=0, init=False)
+    _last_hash: str = field(default=GENESIS_HASH, init=False)
+    _latest: dict | None = field(default=None, init=False, repr=False)
+    _writer: threading.Thread | None = field(default=None, init=False, repr=False)
+    _closed: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+            conn.executescript(_SCHEMA)
+            row = conn.execute(
+                "SELECT seq, ts, payload, prev_hash, hash FROM freezes ORDER BY seq DESC LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                self._seq, self._last_hash = int(row[0]), row[4]
+                self._latest = self._to_record(row)
+            else:
+                anchor = dict(conn.execute("SELECT k, v FROM freeze_meta").fetchall())
+                if "anchor_seq" in anchor:
+                    self._seq = int(anchor["anchor_seq"])
+                    self._last_hash = anchor["anchor_hash"]
+        finally:
+            conn.close()
+
+    def start(self) -> None:
+        """Sobe a escritora (idempotente; ``freeze_many`` também sobe sob demanda)."""
+        with self._lock:
+            self._start_writer()
+
+    def _start_writer(self) -> None:
+        # Preguiçoso: importar o módulo do app (ex. workers de um pool) não cria threads
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="capt-freeze-writer", daemon=True)
+            self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=FULL;")
+        return conn
+
+    @staticmethod
+    def _to_record(row) -> dict:
+        seq, ts, payload, prev_hash, digest = row
+        return {
+            "payload": json.loads(payload),
+            "timestamp": ts,
+            "seq": seq,
+            "prev_hash": prev_hash,
+            "hash": digest,
+        }
+
+    def freeze(self, payload: dict | None = None) -> dict:
+        return self.freeze_many([payload or {}])[0]
+
+    def freeze_many(self, payloads: list[dict]) -> list[dict]:
+        """Encadeia os registros tomando o lock uma única vez e espera o commit do lote."""
+        encoded = [json.dumps(p, sort_keys=True, separators=(",", ":")) for p in payloads]
+        records = []
+        rows = []
+        committed: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise FreezeStoreUnavailable("freeze log is closed")
+            if self.consecutive_failures:
+                raise FreezeStoreUnavailable(f"freeze log writer is failing: {self.last_error}")
+            self._start_writer()
+            for payload, payload_json in zip(payloads, encoded):
+                seq = self._seq + 1
+                ts = time.time()
+                digest = record_hash(self._last_hash, seq, ts, payload_json)
+                records.append(
+                    {
+                        "payload": payload,
+                        "timestamp": ts,
+                        "seq": seq,
+                        "prev_hash": self._last_hash,
+                        "hash": digest,
+                    }
+                )
+                rows.append((seq, ts, payload_json, self._last_hash, digest, payload))
+                self._seq, self._last_hash = seq, digest
+            if not rows:
+                return records
+            # Enfileira dentro do lock: a fila preserva a ordem da cadeia
+            self._queue.put((rows, committed))
+
+        try:
+            committed.result(timeout=self.commit_timeout)
+        except FutureTimeout:
+            raise FreezeStoreUnavailable(
+                f"seq {rows[0][0]}..{rows[-1][0]} not committed within {self.commit_timeout}s"
+            ) from None
+        with self._lock:
+            if self._latest is None or self._latest["seq"] < records[-1]["seq"]:
+                self._latest = records[-1]
+        return records
+
+    def latest(self) -> dict | None:
+        return self._latest
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        next_compaction = time.monotonic()
+        stop = False
+        while not stop:
+            if self.retention is not None and time.monotonic() >= next_compaction:
+                self._run_retention(conn)
+                next_compaction = time.monotonic() + self.compact_interval
+            try:
+                wait = None if self.retention is None else max(0.0, next_compaction - time.monotonic())
+                batch = [self._queue.get(timeout=wait)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.commit_interval
+            size = len(batch[0][0]) if batch[0] is not None else 0
+            while size < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                if item is None:
+                    break
+                size += len(item[0])
+
+            items = [it for it in batch if it is not None]
+            stop = len(items) != len(batch)
+            if items:
+                self._write_batch(conn, items)
+        conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, items: list[tuple[list[tuple], Future]]) -> None:
+        rows = [row for item_rows, _ in items for row in item_rows]
+        key_rows = []
+        for seq, _, _, _, _, payload in rows:
+            key_rows.extend(_key_rows(seq, payload))
+        attempt = 0
+        while True:
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO freezes (seq, ts, payload, prev_hash, hash) VALUES (?, ?, ?, ?, ?)",
+                        [row[:5] for row in rows],
+                    )
+                    conn.executemany(
+                        "INSERT INTO freeze_keys (key, value, seq) VALUES (?, ?, ?)", key_rows
+                    )
+            except sqlite3.Error as exc:
+                with self._lock:
+                    self.write_failures += 1
+                    self.consecutive_failures += 1
+                    self.last_error = f"{type(exc).__name__}: {exc}"
+                    self.last_failure_at = time.time()
+                if self._abandon.is_set():
+                    # close() desistiu de esperar: quem aguarda o lote recebe o erro, nenhum recibo sai
+                    self.last_error += f" (seq {rows[0][0]}..{rows[-1][0]} not persisted)"
+                    for _, committed in items:
+                        committed.set_exception(FreezeStoreUnavailable(self.last_error))
+                    return
+                time.sleep(min(self.max_backoff, 0.05 * 2**attempt))
+                attempt += 1
+                continue
+            with self._lock:
+                self.consecutive_failures = 0
+            for _, committed in items:
+                committed.set_result(None)
+            return
+
+    def close(self, timeout: float | None = None) -> None:
+        """Commita o que está na fila; com ``timeout``, desiste de um lote que continua falhando."""
+        with self._lock:
+            self._closed = True
+            writer = self._writer
+        if writer is None:
+            return
+        self._queue.put(None)
+        writer.join(timeout)
+        if writer.is_alive():
+            self._abandon.set()
+            writer.join()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "healthy": self.consecutive_failures == 0,
+                "pending": self._queue.qsize(),
+                "last_seq": self._seq,
+                "write_failures": self.write_failures,
+                "consecutive_failures": self.consecutive_failures,
+                "last_error": self.last_error,
+                "last_failure_at": self.last_failure_at,
+                "retention": self.retention,
+                "last_compaction": self.last_compaction,
+            }
+
+    def query(
+        self,
+        since: float | None = None,
+        until: float | None = None,
+        key: str | None = None,
+        value: str | None = None,
+        limit: int = 100,
+    ) -> list[dict]:
+        # Lê direto o que está commitado: todo recibo entregue já está no disco
+        where: list[str] = []
+        params: list = []
+        if since is not None:
+            where.append("f.ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("f.ts < ?")
+            params.append(until)
+        if key is not None:
+            sub = "SELECT seq FROM freeze_keys WHERE key = ?"
+            params.append(key)
+            if value is not None:
+                sub += " AND value = ?"
+                params.append(value)
+            where.append(f"f.seq IN ({sub})")
+        sql = "SELECT f.seq, f.ts, f.payload, f.prev_hash, f.hash FROM freezes f"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY f.seq DESC LIMIT ?"
+        params.append(limit)
+
+        conn = self._connect()
+        try:
+            return [self._to_record(r) for r in conn.execute(sql, params).fetchall()]
+        finally:
+            conn.close()
+
+    def verify_chain(self) -> dict:
+        """Recalcula a cadeia desde a âncora (ou gênese) e aponta o primeiro registro inválido."""
+        conn = self._connect()
+        try:
+            anchor = dict(conn.execute("SELECT k, v FROM freeze_meta").fetchall())
+            expected_prev = anchor.get("anchor_hash", GENESIS_HASH)
+            expected_seq = int(anchor.get("anchor_seq", 0)) + 1
+            checked = 0
+            cur = conn.execute("SELECT seq, ts, payload, prev_hash, hash FROM freezes ORDER BY seq")
+            for seq, ts, payload, prev_hash, digest in cur:
+                if (
+                    seq != expected_seq
+                    or prev_hash != expected_prev
+                    or record_hash(prev_hash, seq, ts, payload) != digest
+                ):
+                    return {"ok": False, "checked": checked, "first_bad_seq": seq}
+                expected_prev, expected_seq = digest, seq + 1
+                checked += 1
+            return {"ok": True, "checked": checked, "first_bad_seq": None}
+        finally:
+            conn.close()
+
+    def compact(self, before_ts: float) -> int:
+        """Remove o prefixo de registros com ``ts < before_ts`` preservando a âncora da cadeia.
+
+        Só toca linhas já commitadas; a escritora continua anexando em paralelo (o
+        ``busy_timeout`` da conexão serializa as duas transações).
+        """
+        conn = self._connect()
+        try:
+            return self._compact(conn, before_ts)
+        finally:
+            conn.close()
+
+    def _run_retention(self, conn: sqlite3.Connection) -> None:
+        before_ts = time.time() - self.retention
+        try:
+            removed = self._compact(conn, before_ts)
+        except sqlite3.Error as exc:
+            with self._lock:
+                self.last_error = f"compaction failed: {type(exc).__name__}: {exc}"
+            return
+        self.last_compaction = {"at": time.time(), "before_ts": before_ts, "removed": removed}
+
+    @staticmethod
+    def _compact(conn: sqlite3.Connection, before_ts: float) -> int:
+        with conn:
+            row = conn.execute(
+                "SELECT seq, hash FROM freezes WHERE seq < "
+                "COALESCE((SELECT MIN(seq) FROM freezes WHERE ts >= ?), "
+                "(SELECT MAX(seq) + 1 FROM freezes)) ORDER BY seq DESC LIMIT 1",
+                (before_ts,),
+            ).fetchone()
+            if row is None:
+                return 0
+            cut_seq, cut_hash = row
+            removed = conn.execute("DELETE FROM freezes WHERE seq <= ?", (cut_seq,)).rowcount
+            conn.execute("DELETE FROM freeze_keys WHERE seq <= ?", (cut_seq,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO freeze_meta (k, v) VALUES (?, ?)",
+                [("anchor_seq", str(cut_seq)), ("anchor_hash", cut_hash)],
+            )
+        conn.execute("PRAGMA incremental_vacuum;")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        return removed
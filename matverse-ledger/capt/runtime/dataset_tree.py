@@ -0,0 +1,154 @@
+"""Árvore Merkle incremental para o hash de datasets montados."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from dataclasses import dataclass, field
+
+
+@dataclass
+class _DirNode:
+    mtime_ns: int
+    ino: int
+    files: dict[str, tuple[int, int, int]]
+    subdirs: list[str]
+    child_digests: dict[str, str] = field(default_factory=dict)
+    digest: str = ""
+
+
+def _join(rel: str, name: str) -> str:
+    return f"{rel}/{name}" if rel else name
+
+
+@dataclass
+class DatasetMerkleTree:
+    """Hash Merkle persistente de uma árvore de diretórios.
+
+    Cada diretório guarda (size, mtime_ns, inode) das entradas. Em ``refresh()``
+    todo diretório recebe um ``stat``, mas só os que tiveram mtime/inode alterado
+    são relistados e têm as entradas re-``stat``adas; os demais reaproveitam o
+    digest em cache. Alterações *in-place* de conteúdo que não mudam o mtime do
+    diretório só aparecem com ``refresh(full=True)``.
+    """
+
+    base_path: str
+    nodes: dict[str, _DirNode] = field(default_factory=dict)
+    root_digest: str = "missing"
+    last_changes: list[str] = field(default_factory=list)
+    last_stats: dict = field(default_factory=lambda: {"directories": 0, "files": 0})
+
+    def refresh(self, full: bool = False) -> list[str]:
+        """Atualiza a árvore e devolve os subcaminhos alterados desde o último refresh."""
+        changes: list[str] = []
+        if not os.path.isdir(self.base_path):
+            if self.nodes:
+                changes.append("")
+            self.nodes.clear()
+            self.root_digest = "missing"
+        else:
+            self.root_digest = self._visit("", full, changes) or "missing"
+        self.last_changes = changes
+        self.last_stats = {
+            "directories": len(self.nodes),
+            "files": sum(len(n.files) for n in self.nodes.values()),
+        }
+        return changes
+
+    def _visit(self, rel: str, full: bool, changes: list[str]) -> str | None:
+        path = os.path.join(self.base_path, rel) if rel else self.base_path
+        try:
+            st = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            self._drop(rel)
+            return None
+
+        node = self.nodes.get(rel)
+        dirty = False
+        if full or node is None or node.mtime_ns != st.st_mtime_ns or node.ino != st.st_ino:
+            node = self._relist(rel, path, st, node, changes)
+            dirty = True
+
+        for name in node.subdirs:
+            child = self._visit(_join(rel, name), full, changes)
+            if child is None:
+                dirty = node.child_digests.pop(name, None) is not None or dirty
+                continue
+            if node.child_digests.get(name) != child:
+                node.child_digests[name] = child
+                dirty = True
+
+        if dirty or not node.digest:
+            node.digest = self._digest(node)
+        return node.digest
+
+    def _relist(
+        self,
+        rel: str,
+        path: str,
+        st: os.stat_result,
+        old: _DirNode | None,
+        changes: list[str],
+    ) -> _DirNode:
+        files: dict[str, tuple[int, int, int]] = {}
+        subdirs: list[str] = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        else:
+                            est = entry.stat(follow_symlinks=False)
+                            files[entry.name] = (est.st_size, est.st_mtime_ns, est.st_ino)
+                    except FileNotFoundError:
+                        continue
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            pass
+        subdirs.sort()
+
+        old_files = old.files if old is not None else {}
+        old_subdirs = set(old.subdirs) if old is not None else set()
+        for name in sorted(files.keys() | old_files.keys()):
+            if files.get(name) != old_files.get(name):
+                changes.append(_join(rel, name))
+        for name in sorted(old_subdirs - set(subdirs)):
+            changes.append(_join(rel, name))
+            self._drop(_join(rel, name))
+        for name in subdirs:
+            if name not in old_subdirs:
+                changes.append(_join(rel, name))
+
+        child_digests = {}
+        if old is not None:
+            child_digests = {k: v for k, v in old.child_digests.items() if k in subdirs}
+
+        node = _DirNode(
+            mtime_ns=st.st_mtime_ns,
+            ino=st.st_ino,
+            files=files,
+            subdirs=subdirs,
+            child_digests=child_digests,
+        )
+        self.nodes[rel] = node
+        return node
+
+    def _drop(self, rel: str) -> None:
+        node = self.nodes.pop(rel, None)
+        if node is None:
+            return
+        for name in node.subdirs:
+            self._drop(_join(rel, name))
+
+    @staticmethod
+    def _digest(node: _DirNode) -> str:
+        h = hashlib.sha256()
+        entries = [(name, "f", f"{size}:{mtime_ns}") for name, (size, mtime_ns, _) in node.files.items()]
+        entries += [(name, "d", node.child_digests.get(name, "")) for name in node.subdirs]
+        for name, kind, value in sorted(entries):
+            h.update(f"{kind}:{name}:{value}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def stats(self) -> dict:
+        # Calculado no refresh: leitura segura enquanto o sampler atualiza a árvore
+        return dict(self.last_stats)
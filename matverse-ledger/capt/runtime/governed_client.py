@@ -2,13 +2,27 @@
 
 from __future__ import annotations
 
-import hashlib
+import asyncio
 import os
+import threading
 import time
 from dataclasses import dataclass, field
 
 import psutil
 
+from capt.runtime.dataset_tree import DatasetMerkleTree
+from capt.runtime.io_probe import run_io_probe
+from capt.runtime.ring_buffer import MetricsRingBuffer
+
+# Métricas numéricas retidas no ring buffer (o dict completo fica em latest_metrics)
+BUFFERED_FIELDS = (
+    "chromeos_cpu",
+    "chromeos_mem",
+    "terabox_sync_rate",
+    "datasets_changed",
+    "model_cache_mb",
+)
+
 
 @dataclass
 class ChromeOSRuntimeGovernor:
@@ -17,36 +31,43 @@ class ChromeOSRuntimeGovernor:
     chromeos_path: str = "/mnt/chromeos"
     terabox_path: str = "/mnt/terabox"
     terabox_sync: bool = True
-    metrics_buffer: list[dict] = field(default_factory=list)
-    max_buffer: int = 200
+    metrics_buffer: MetricsRingBuffer | None = None
+    max_buffer: int = 86_400
     last_sync_ts: float = field(default_factory=time.time)
+    dataset_tree: DatasetMerkleTree | None = None
+    sample_interval: float = 5.0
+    # refresh() incremental só relista diretórios com mtime alterado; arquivos reescritos
+    # in-place só entram com refresh(full=True), feito no máximo a cada N segundos
+    datasets_full_refresh: float = 300.0
+    latest_metrics: dict | None = None
+    sample_failures: int = field(default=0, init=False)
+    consecutive_sample_failures: int = field(default=0, init=False)
+    last_sample_error: str | None = field(default=None, init=False)
+    _last_full_refresh: float | None = field(default=None, init=False, repr=False, compare=False)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+    _sampler: threading.Thread | None = field(default=None, init=False, repr=False, compare=False)
+    _sampler_stop: threading.Event = field(
+        default_factory=threading.Event, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        if self.metrics_buffer is None:
+            self.metrics_buffer = MetricsRingBuffer(self.max_buffer, BUFFERED_FIELDS)
 
     def _append_metrics(self, metrics: dict) -> dict:
-        self.metrics_buffer.append(metrics)
-        if len(self.metrics_buffer) > self.max_buffer:
-            self.metrics_buffer = self.metrics_buffer[-self.max_buffer :]
+        values = dict(metrics)
+        values["model_cache_mb"] = metrics.get("model_cache", {}).get("total_mb")
+        self.metrics_buffer.append(metrics["timestamp"], values)
         return metrics
 
-    def _hash_entries(self, base_path: str, limit: int = 200) -> str:
-        if not os.path.exists(base_path):
-            return "missing"
-
-        entries = []
-        for root, dirs, files in os.walk(base_path):
-            for name in sorted(dirs + files):
-                path = os.path.join(root, name)
-                try:
-                    stat = os.stat(path)
-                    entries.append(f"{os.path.relpath(path, base_path)}:{stat.st_size}:{stat.st_mtime}")
-                except FileNotFoundError:
-                    continue
-                if len(entries) >= limit:
-                    break
-            if len(entries) >= limit:
-                break
-
-        digest = hashlib.sha256("|".join(entries).encode("utf-8")).hexdigest()
-        return digest
+    def aggregate_metrics(self, window_s: float) -> dict:
+        """Agregados (mean, min/max, p50/p95/p99, taxa) dos últimos ``window_s`` segundos."""
+        now = time.time()
+        result = self.metrics_buffer.aggregate(now - window_s)
+        result["window_s"] = window_s
+        return result
 
     def get_sync_rate(self) -> float:
         now = time.time()
@@ -54,7 +75,20 @@ class ChromeOSRuntimeGovernor:
         return 1.0 / elapsed
 
     def hash_datasets(self) -> str:
-        return self._hash_entries(self.chromeos_path)
+        if self.dataset_tree is None or self.dataset_tree.base_path != self.chromeos_path:
+            self.dataset_tree = DatasetMerkleTree(self.chromeos_path)
+        now = time.monotonic()
+        full = self._last_full_refresh is None or now - self._last_full_refresh >= self.datasets_full_refresh
+        self.dataset_tree.refresh(full=full)
+        if full:
+            self._last_full_refresh = now
+        return self.dataset_tree.root_digest
+
+    def changed_datasets(self) -> list[str]:
+        """Subcaminhos alterados entre as duas últimas capturas."""
+        if self.dataset_tree is None:
+            return []
+        return list(self.dataset_tree.last_changes)
 
     def analyze_model_cache(self) -> dict:
         cache_path = os.path.join(self.chromeos_path, "models")
@@ -77,26 +111,92 @@ class ChromeOSRuntimeGovernor:
             "total_mb": round(total_bytes / (1024 * 1024), 2),
         }
 
-    async def capture_metrics(self) -> dict:
-        metrics = {
-            "chromeos_cpu": psutil.cpu_percent(interval=0.1),
-            "chromeos_mem": psutil.virtual_memory().percent,
-            "terabox_sync_rate": self.get_sync_rate(),
-            "datasets_hash": self.hash_datasets(),
-            "model_cache": self.analyze_model_cache(),
-            "timestamp": time.time(),
-        }
-        return self._append_metrics(metrics)
-
-    async def measure_terabox_latency(self) -> dict:
+    def sample_metrics(self, cpu_interval: float | None = 0.1) -> dict:
+        """Coleta síncrona (bloqueante): chamar do sampler ou de um executor."""
+        with self._lock:
+            metrics = {
+                "chromeos_cpu": psutil.cpu_percent(interval=cpu_interval),
+                "chromeos_mem": psutil.virtual_memory().percent,
+                "terabox_sync_rate": self.get_sync_rate(),
+                "datasets_hash": self.hash_datasets(),
+                "datasets_changed": len(self.changed_datasets()),
+                "model_cache": self.analyze_model_cache(),
+                "timestamp": time.time(),
+            }
+            self.latest_metrics = metrics
+            return self._append_metrics(metrics)
+
+    def sampler_running(self) -> bool:
+        return self._sampler is not None and self._sampler.is_alive()
+
+    def start_sampler(self, interval: float | None = None) -> None:
+        if interval is not None:
+            self.sample_interval = interval
+        if self.sampler_running():
+            return
+        self._sampler_stop.clear()
+        self._sampler = threading.Thread(
+            target=self._sampler_loop, name="capt-metrics-sampler", daemon=True
+        )
+        self._sampler.start()
+
+    def stop_sampler(self, timeout: float | None = None) -> None:
+        self._sampler_stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout)
+        self._sampler = None
+
+    def _sampler_loop(self) -> None:
+        # 1ª amostra mede CPU numa janela curta; as seguintes usam o delta desde a anterior
+        cpu_interval: float | None = 0.1
+        while not self._sampler_stop.is_set():
+            try:
+                self.sample_metrics(cpu_interval=cpu_interval)
+                cpu_interval = None
+                self.consecutive_sample_failures = 0
+            except Exception as exc:  # mantém a última amostra e registra a falha
+                self.sample_failures += 1
+                self.consecutive_sample_failures += 1
+                self.last_sample_error = f"{type(exc).__name__}: {exc}"
+            self._sampler_stop.wait(self.sample_interval)
+
+    async def capture_metrics(self, force: bool = False) -> dict:
+        if not force and self.latest_metrics is not None and self.sampler_running():
+            return self.latest_metrics
+
+        cpu_interval = None if self.sampler_running() else 0.1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.sample_metrics, cpu_interval)
+
+    async def measure_terabox_latency(
+        self,
+        probe: bool = False,
+        file_size: int = 16 * 1024 * 1024,
+        block_size: int = 4096,
+        random_ops: int = 256,
+        direct: bool = False,
+    ) -> dict:
         start = time.time()
         exists = os.path.exists(self.terabox_path)
         latency_ms = (time.time() - start) * 1000
-        return {
+        result = {
             "terabox_path": self.terabox_path,
             "available": exists,
             "latency_ms": round(latency_ms, 2),
         }
+        if probe and exists:
+            loop = asyncio.get_running_loop()
+            result["io_probe"] = await loop.run_in_executor(
+                None,
+                lambda: run_io_probe(
+                    self.terabox_path,
+                    file_size=file_size,
+                    block_size=block_size,
+                    random_ops=random_ops,
+                    direct=direct,
+                ),
+            )
+        return result
 
     def status(self) -> dict:
         return {
@@ -104,4 +204,21 @@ class ChromeOSRuntimeGovernor:
             "terabox_path": self.terabox_path,
             "terabox_sync": self.terabox_sync,
             "metrics_buffered": len(self.metrics_buffer),
+            "metrics_capacity": self.metrics_buffer.capacity,
+            "datasets_tree": self.dataset_tree.stats() if self.dataset_tree else None,
+            "datasets_full_refresh_age_s": (
+                round(time.monotonic() - self._last_full_refresh, 3)
+                if self._last_full_refresh is not None
+                else None
+            ),
+            "sampler_running": self.sampler_running(),
+            "sample_interval": self.sample_interval,
+            "latest_sample_age_s": (
+                round(time.time() - self.latest_metrics["timestamp"], 3)
+                if self.latest_metrics
+                else None
+            ),
+            "sample_failures": self.sample_failures,
+            "consecutive_sample_failures": self.consecutive_sample_failures,
+            "last_sample_error": self.last_sample_error,
         }
@@ -0,0 +1,152 @@
+"""Probe de I/O (latência/throughput) para diretórios montados, ex.: TeraBox."""
+
+from __future__ import annotations
+
+import mmap
+import os
+import random
+import shutil
+import tempfile
+import time
+
+
+def _percentile(sorted_values: list[int], q: float) -> int:
+    if not sorted_values:
+        return 0
+    idx = min(len(sorted_values) - 1, max(0, round((len(sorted_values) - 1) * q)))
+    return sorted_values[idx]
+
+
+def _summarize(latencies_ns: list[int], nbytes: int, elapsed_ns: int) -> dict:
+    lat = sorted(latencies_ns)
+    seconds = max(elapsed_ns, 1) / 1e9
+    # Histograma em buckets log2 de microssegundos: "<=1us", "<=2us", "<=4us", ...
+    histogram: dict[str, int] = {}
+    for ns in lat:
+        us = max(ns / 1000, 1.0)
+        bucket = 1 << max(0, (int(us) - 1).bit_length())
+        label = f"<={bucket}us"
+        histogram[label] = histogram.get(label, 0) + 1
+    return {
+        "ops": len(lat),
+        "bytes": nbytes,
+        "seconds": round(seconds, 6),
+        "iops": round(len(lat) / seconds, 1),
+        "mb_s": round(nbytes / (1024 * 1024) / seconds, 2),
+        "latency_us": {
+            "p50": round(_percentile(lat, 0.50) / 1000, 2),
+            "p99": round(_percentile(lat, 0.99) / 1000, 2),
+            "max": round(lat[-1] / 1000, 2) if lat else 0.0,
+            "mean": round(sum(lat) / len(lat) / 1000, 2) if lat else 0.0,
+        },
+        "histogram": histogram,
+    }
+
+
+def _open(path: str, flags: int, direct: bool, block_size: int) -> tuple[int, bool]:
+    if direct and hasattr(os, "O_DIRECT") and block_size % mmap.PAGESIZE == 0:
+        try:
+            return os.open(path, flags | os.O_DIRECT, 0o600), True
+        except OSError:
+            # tmpfs e alguns FUSE não aceitam O_DIRECT: cai para fadvise(DONTNEED)
+            pass
+    return os.open(path, flags, 0o600), False
+
+
+def _drop_cache(fd: int) -> None:
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+
+
+def run_io_probe(
+    base_dir: str,
+    file_size: int = 16 * 1024 * 1024,
+    block_size: int = 4096,
+    random_ops: int = 256,
+    direct: bool = False,
+    seed: int = 0,
+) -> dict:
+    """Testes sequencial e aleatório de escrita/leitura num diretório temporário em ``base_dir``.
+
+    Bloqueante: chamar fora do event loop. ``direct=True`` tenta ``O_DIRECT`` e, se o
+    FS não suportar, descarta o page cache com ``posix_fadvise`` antes das leituras.
+    """
+    if block_size <= 0 or block_size % 512:
+        raise ValueError("block_size must be a positive multiple of 512")
+    blocks = max(1, file_size // block_size)
+    file_size = blocks * block_size
+    rng = random.Random(seed)
+
+    scratch = tempfile.mkdtemp(prefix=".capt_io_probe_", dir=base_dir)
+    path = os.path.join(scratch, "probe.bin")
+    # mmap anônimo = buffer alinhado à página, exigido por O_DIRECT
+    buf = mmap.mmap(-1, block_size)
+    buf.write(os.urandom(block_size))
+    results: dict = {}
+    used_direct = False
+    try:
+        fd, used_direct = _open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, direct, block_size)
+        try:
+            lat = []
+            t0 = time.perf_counter_ns()
+            for i in range(blocks):
+                s = time.perf_counter_ns()
+                os.pwrite(fd, buf, i * block_size)
+                lat.append(time.perf_counter_ns() - s)
+            os.fsync(fd)
+            results["seq_write"] = _summarize(lat, file_size, time.perf_counter_ns() - t0)
+            if direct:
+                _drop_cache(fd)
+        finally:
+            os.close(fd)
+
+        fd, _ = _open(path, os.O_RDONLY, direct, block_size)
+        try:
+            lat = []
+            t0 = time.perf_counter_ns()
+            for i in range(blocks):
+                s = time.perf_counter_ns()
+                os.preadv(fd, [buf], i * block_size)
+                lat.append(time.perf_counter_ns() - s)
+            results["seq_read"] = _summarize(lat, file_size, time.perf_counter_ns() - t0)
+
+            if direct:
+                _drop_cache(fd)
+            lat = []
+            t0 = time.perf_counter_ns()
+            for _ in range(random_ops):
+                s = time.perf_counter_ns()
+                os.preadv(fd, [buf], rng.randrange(blocks) * block_size)
+                lat.append(time.perf_counter_ns() - s)
+            results["rand_read"] = _summarize(lat, random_ops * block_size, time.perf_counter_ns() - t0)
+        finally:
+            os.close(fd)
+
+        fd, _ = _open(path, os.O_WRONLY, direct, block_size)
+        try:
+            lat = []
+            t0 = time.perf_counter_ns()
+            for _ in range(random_ops):
+                s = time.perf_counter_ns()
+                os.pwrite(fd, buf, rng.randrange(blocks) * block_size)
+                lat.append(time.perf_counter_ns() - s)
+            os.fsync(fd)
+            results["rand_write"] = _summarize(lat, random_ops * block_size, time.perf_counter_ns() - t0)
+        finally:
+            os.close(fd)
+    finally:
+        buf.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return {
+        "base_dir": base_dir,
+        "file_size": file_size,
+        "block_size": block_size,
+        "random_ops": random_ops,
+        "direct_requested": direct,
+        "direct_io": used_direct,
+        "tests": results,
+    }
@@ -0,0 +1,105 @@
+"""Ring buffer numérico (struct-of-arrays) para métricas CAPT."""
+
+from __future__ import annotations
+
+import math
+import threading
+from array import array
+from dataclasses import dataclass, field
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    # Interpolação linear entre vizinhos (mesmo critério do numpy "linear")
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    pos = (len(sorted_values) - 1) * q
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    frac = pos - lo
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * frac
+
+
+@dataclass
+class MetricsRingBuffer:
+    """Capacidade fixa, memória pré-alocada e append O(1).
+
+    Cada métrica vive num ``array('d')`` próprio; ``timestamp`` é obrigatório e
+    crescente, o que permite localizar o início de uma janela por busca binária.
+    """
+
+    capacity: int
+    fields: tuple[str, ...]
+    _columns: dict[str, array] = field(init=False, repr=False)
+    _ts: array = field(init=False, repr=False)
+    _head: int = field(default=0, init=False)
+    _size: int = field(default=0, init=False)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        if self.capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self._ts = array("d", bytes(8 * self.capacity))
+        self._columns = {name: array("d", bytes(8 * self.capacity)) for name in self.fields}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, values: dict) -> None:
+        with self._lock:
+            i = self._head
+            self._ts[i] = timestamp
+            for name, col in self._columns.items():
+                v = values.get(name)
+                col[i] = float(v) if v is not None else math.nan
+            self._head = (i + 1) % self.capacity
+            if self._size < self.capacity:
+                self._size += 1
+
+    def _physical(self, logical: int) -> int:
+        start = (self._head - self._size) % self.capacity
+        return (start + logical) % self.capacity
+
+    def _first_at_or_after(self, ts: float) -> int:
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ts[self._physical(mid)] < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def window(self, since: float) -> tuple[list[float], dict[str, list[float]]]:
+        """Cópia das amostras com ``timestamp >= since`` (em ordem cronológica)."""
+        with self._lock:
+            first = self._first_at_or_after(since)
+            idx = [self._physical(k) for k in range(first, self._size)]
+            ts = [self._ts[i] for i in idx]
+            cols = {name: [col[i] for i in idx] for name, col in self._columns.items()}
+        return ts, cols
+
+    def aggregate(self, since: float) -> dict:
+        ts, cols = self.window(since)
+        result: dict = {"samples": len(ts), "from_ts": ts[0] if ts else None, "to_ts": ts[-1] if ts else None}
+        metrics: dict[str, dict | None] = {}
+        for name, values in cols.items():
+            points = [(t, v) for t, v in zip(ts, values) if not math.isnan(v)]
+            if not points:
+                metrics[name] = None
+                continue
+            vals = sorted(v for _, v in points)
+            (t0, v0), (t1, v1) = points[0], points[-1]
+            metrics[name] = {
+                "count": len(vals),
+                "mean": math.fsum(vals) / len(vals),
+                "min": vals[0],
+                "max": vals[-1],
+                "p50": _percentile(vals, 0.50),
+                "p95": _percentile(vals, 0.95),
+                "p99": _percentile(vals, 0.99),
+                "rate_per_s": (v1 - v0) / (t1 - t0) if t1 > t0 else 0.0,
+            }
+        result["metrics"] = metrics
+        return result
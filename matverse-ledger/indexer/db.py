@@ -1,10 +1,19 @@
-from sqlalchemy import BigInteger, Column, Integer, String, create_engine
+from sqlalchemy import BigInteger, Column, Index, Integer, String, create_engine, inspect
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 Base = declarative_base()
 
+# Chain usada para as linhas de DBs anteriores ao multi-chain (devnet local)
+LEGACY_CHAIN_ID = 31337
+# Contrato dessas linhas é desconhecido; "" (não NULL) porque contract entra na PK de pole
+LEGACY_CONTRACT = ""
+
 class Pose(Base):
     __tablename__ = "pose"
+    __table_args__ = (
+        Index("ix_pose_chain_block", "chain_id", "block_number"),
+        Index("ix_pose_chain_tx", "chain_id", "tx_hash"),
+    )
     id = Column(Integer, primary_key=True)
     claim_hash = Column(String, index=True)
     submitter = Column(String)
@@ -13,11 +22,21 @@ class Pose(Base):
     block_number = Column(BigInteger)
     tx_hash = Column(String)
     timestamp = Column(BigInteger)
+    chain_id = Column(BigInteger)
+    contract = Column(String)
 
 class Pole(Base):
     __tablename__ = "pole"
+    __table_args__ = (
+        Index("ix_pole_chain_block", "chain_id", "block_number"),
+        Index("ix_pole_chain_tx", "chain_id", "tx_hash"),
+    )
+    # (chain_id, contract) por último na PK: leituras por (claim_hash, run_hash) seguem em
+    # ordem de PK, e o mesmo run em dois deployments da mesma chain não colide
     claim_hash = Column(String, primary_key=True)
     run_hash = Column(String, primary_key=True)
+    chain_id = Column(BigInteger, primary_key=True)
+    contract = Column(String, primary_key=True)
     submitter = Column(String)
     verdict = Column(Integer)
     omega_u6 = Column(BigInteger)
@@ -28,7 +47,89 @@ class Pole(Base):
     tx_hash = Column(String)
     timestamp = Column(BigInteger, index=True)
 
-def init_db(path: str):
-    eng = create_engine(f"sqlite:///{path}")
+class IndexerCursor(Base):
+    """Último bloco indexado por (chain, contrato): cada worker avança o seu."""
+    __tablename__ = "indexer_cursor"
+    chain_id = Column(BigInteger, primary_key=True)
+    contract = Column(String, primary_key=True)
+    last_block = Column(BigInteger, nullable=False)
+    updated_at = Column(BigInteger)
+
+# Busca full-text em pose.metadata_uri: FTS5 external-content (sem duplicar o texto).
+# unicode61 quebra em toda pontuação, então host e segmentos de path viram tokens
+# ("https://huggingface.co/org/model.bin" -> https, huggingface, co, org, model, bin).
+# Os triggers mantêm o índice em sincronia com qualquer escrita em pose.
+POSE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS pose_fts USING fts5("
+    "metadata_uri, content='pose', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS pose_fts_ai AFTER INSERT ON pose BEGIN "
+    "INSERT INTO pose_fts(rowid, metadata_uri) VALUES (new.id, new.metadata_uri); END",
+    "CREATE TRIGGER IF NOT EXISTS pose_fts_ad AFTER DELETE ON pose BEGIN "
+    "INSERT INTO pose_fts(pose_fts, rowid, metadata_uri) VALUES ('delete', old.id, old.metadata_uri); END",
+    "CREATE TRIGGER IF NOT EXISTS pose_fts_au AFTER UPDATE OF metadata_uri ON pose BEGIN "
+    "INSERT INTO pose_fts(pose_fts, rowid, metadata_uri) VALUES ('delete', old.id, old.metadata_uri); "
+    "INSERT INTO pose_fts(rowid, metadata_uri) VALUES (new.id, new.metadata_uri); END",
+)
+
+
+def ensure_pose_fts(eng) -> None:
+    with eng.begin() as conn:
+        existed = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='pose_fts'"
+        ).first()
+        for ddl in POSE_FTS_DDL:
+            conn.exec_driver_sql(ddl)
+        if not existed:
+            # DB anterior ao índice: indexa as linhas que já existem
+            conn.exec_driver_sql("INSERT INTO pose_fts(pose_fts) VALUES ('rebuild')")
+
+
+def migrate_chain_columns(eng, legacy_chain_id: int = LEGACY_CHAIN_ID) -> None:
+    """Adds chain_id/contract to DBs created before multi-chain indexing.
+
+    pose only gains columns. pole's primary key changes, so whenever it differs from
+    the model the table is renamed, recreated and copied back.
+    """
+    insp = inspect(eng)
+    tables = set(insp.get_table_names())
+    with eng.begin() as conn:
+        if "pose" in tables and "chain_id" not in {c["name"] for c in insp.get_columns("pose")}:
+            conn.exec_driver_sql("ALTER TABLE pose ADD COLUMN chain_id BIGINT")
+            conn.exec_driver_sql("ALTER TABLE pose ADD COLUMN contract VARCHAR")
+            conn.exec_driver_sql("UPDATE pose SET chain_id = ?, contract = ?", (legacy_chain_id, LEGACY_CONTRACT))
+        pk = [c.name for c in Pole.__table__.primary_key.columns]
+        if "pole" in tables and insp.get_pk_constraint("pole")["constrained_columns"] != pk:
+            old_cols = {c["name"] for c in insp.get_columns("pole")}
+            conn.exec_driver_sql("ALTER TABLE pole RENAME TO pole_legacy")
+            # Os índices seguem a tabela renomeada; liberam os nomes para a nova pole
+            for (name,) in conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='pole_legacy' AND sql IS NOT NULL"
+            ).fetchall():
+                conn.exec_driver_sql(f'DROP INDEX "{name}"')
+            Pole.__table__.create(conn)
+            legacy = {"chain_id": "?", "contract": "?"}
+            cols = [c.name for c in Pole.__table__.columns]
+            exprs = [
+                (f"COALESCE({c}, {legacy[c]})" if c in old_cols else legacy[c]) if c in legacy else c
+                for c in cols
+            ]
+            conn.exec_driver_sql(
+                f"INSERT INTO pole ({', '.join(cols)}) SELECT {', '.join(exprs)} FROM pole_legacy",
+                tuple(legacy_chain_id if c == "chain_id" else LEGACY_CONTRACT for c in cols if c in legacy),
+            )
+            conn.exec_driver_sql("DROP TABLE pole_legacy")
+
+
+def init_db(path: str, legacy_chain_id: int = LEGACY_CHAIN_ID):
+    # timeout: vários workers (um por chain/deployment) escrevem no mesmo arquivo
+    eng = create_engine(f"sqlite:///{path}", connect_args={"timeout": 30})
+    # WAL: snapshots (scripts/snapshot_sqlite.py) leem sem bloquear os commits do indexer
+    with eng.connect() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    migrate_chain_columns(eng, legacy_chain_id)
     Base.metadata.create_all(eng)
+    # create_all não mexe em tabelas existentes: índices novos de pose vêm daqui
+    for idx in Pose.__table__.indexes:
+        idx.create(eng, checkfirst=True)
+    ensure_pose_fts(eng)
     return sessionmaker(bind=eng)
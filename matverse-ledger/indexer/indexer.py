@@ -1,102 +1,275 @@
 import argparse
+import multiprocessing as mp
+import os
+import re
+import sys
+import time
+
+import yaml
 from web3 import Web3
-from db import init_db, Pose, Pole
+from db import init_db, IndexerCursor, LEGACY_CHAIN_ID, LEGACY_CONTRACT, Pose, Pole
 
 # Assinaturas dos eventos
 POSE_EVENT = "PoSERegistered(bytes32,address,string,bytes32,uint256)"
 POLE_EVENT = "PoLERecorded(bytes32,address,uint8,uint256,uint256,uint256,uint256,bytes32,uint256)"
 
+DEFAULTS = {"batch_blocks": 2000, "confirmations": 0, "poll_seconds": 5.0, "from_block": 0}
+
 def topic(w3, sig: str):
     return w3.keccak(text=sig).hex()
 
 def u6_to_float(x: int) -> float:
     return x / 1_000_000.0
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--rpc", required=True)
-    ap.add_argument("--pose", required=True)
-    ap.add_argument("--pole", required=True)
-    ap.add_argument("--db", required=True)
-    ap.add_argument("--from-block", type=int, default=0)
-    args = ap.parse_args()
+def _expand(value):
+    # Endereços/RPCs podem vir do ambiente (ex.: .runtime/addresses.env): "${POSE_ADDR}"
+    return os.path.expandvars(value) if isinstance(value, str) else value
 
-    w3 = Web3(Web3.HTTPProvider(args.rpc))
-    Session = init_db(args.db)
-    sess = Session()
+def load_config(path: str) -> tuple[dict, list[dict]]:
+    """Lê o YAML e devolve (config, workers): um worker por (chain, deployment)."""
+    with open(path, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+    defaults = {**DEFAULTS, **(cfg.get("defaults") or {})}
+    workers = []
+    for chain in cfg["chains"]:
+        chain_opts = {k: chain[k] for k in DEFAULTS if k in chain}
+        for dep in chain["deployments"]:
+            spec = {**defaults, **chain_opts, **{k: dep[k] for k in DEFAULTS if k in dep}}
+            spec.update(
+                chain=chain.get("name", str(chain["chain_id"])),
+                chain_id=int(chain["chain_id"]),
+                rpc=_expand(chain["rpc"]),
+                deployment=dep.get("name", "default"),
+                pose=_expand(dep["pose"]),
+                pole=_expand(dep["pole"]),
+            )
+            workers.append(spec)
+    keys = [(w["chain_id"], w["pose"].lower(), w["pole"].lower()) for w in workers]
+    if len(set(keys)) != len(keys):
+        raise ValueError("duplicate (chain_id, pose, pole) deployment in config")
+    return cfg, workers
 
-    pose_topic = topic(w3, POSE_EVENT)
-    pole_topic = topic(w3, POLE_EVENT)
+def decode_pose(w3, lg, chain_id: int, contract: str) -> Pose:
+    # decode manual: topics[1]=claimHash, topics[2]=submitter; data has metadataURI, proofHash, timestamp
+    metadata_uri, proof_hash_bytes, ts = w3.codec.decode(["string","bytes32","uint256"], lg["data"])
+    return Pose(
+        claim_hash="0x" + lg["topics"][1].hex()[2:],
+        submitter="0x" + lg["topics"][2].hex()[26:],  # last 20 bytes
+        metadata_uri=metadata_uri,
+        proof_hash="0x" + proof_hash_bytes.hex(),
+        block_number=lg["blockNumber"],
+        tx_hash=lg["transactionHash"].hex(),
+        timestamp=int(ts),
+        chain_id=chain_id,
+        contract=contract,
+    )
 
-    def fetch(addr, t0, from_block):
-        logs = w3.eth.get_logs({
-            "fromBlock": from_block,
-            "toBlock": "latest",
-            "address": Web3.to_checksum_address(addr),
+def decode_pole(w3, lg, chain_id: int, contract: str) -> Pole:
+    verdict, omega_u6, psi_u6, cvar_u6, latency_ms, run_hash_bytes, ts = w3.codec.decode(
+        ["uint8","uint256","uint256","uint256","uint256","bytes32","uint256"],
+        lg["data"]
+    )
+    return Pole(
+        claim_hash="0x" + lg["topics"][1].hex()[2:],
+        submitter="0x" + lg["topics"][2].hex()[26:],
+        verdict=int(verdict),
+        omega_u6=int(omega_u6),
+        psi_u6=int(psi_u6),
+        cvar_u6=int(cvar_u6),
+        latency_ms=int(latency_ms),
+        run_hash="0x" + run_hash_bytes.hex(),
+        block_number=lg["blockNumber"],
+        tx_hash=lg["transactionHash"].hex(),
+        timestamp=int(ts),
+        chain_id=chain_id,
+        contract=contract,
+    )
+
+# Erros de get_logs que indicam faixa/resultado grande demais (variam por provedor).
+# -32005 é "limit exceeded" (EIP-1474); o resto vem da mensagem do nó.
+RANGE_ERROR_CODES = {-32005}
+RANGE_ERROR_RE = re.compile(
+    r"block range|range (is )?too (large|wide|big)|too many (results|logs|blocks)|"
+    r"more than \d+ results|query returned more than|response size|exceeds? (the )?max",
+    re.IGNORECASE,
+)
+
+def range_too_large(exc: Exception) -> bool:
+    # web3 6 levanta ValueError(resposta["error"]) com o dict {"code", "message"} do JSON-RPC
+    err = exc.args[0] if exc.args else None
+    if isinstance(err, dict):
+        if err.get("code") in RANGE_ERROR_CODES:
+            return True
+        err = err.get("message", "")
+    return bool(RANGE_ERROR_RE.search(str(err if err is not None else exc)))
+
+def fetch_logs(w3, addr: str, t0: str, lo: int, hi: int) -> list:
+    """get_logs em [lo, hi]; se o RPC recusar a faixa por tamanho, divide ao meio e tenta de novo.
+
+    Outros erros (conexão, timeout, auth) sobem direto para o worker.
+    """
+    try:
+        return w3.eth.get_logs({
+            "fromBlock": lo,
+            "toBlock": hi,
+            "address": addr,
             "topics": [t0],
         })
-        return logs
-
-    # PoSE
-    pose_logs = fetch(args.pose, pose_topic, args.from_block)
-    for lg in pose_logs:
-        # decode manual: topics[1]=claimHash, topics[2]=submitter; data has metadataURI, proofHash, timestamp
-        claim_hash = "0x" + lg["topics"][1].hex()[2:]
-        submitter  = "0x" + lg["topics"][2].hex()[26:]  # last 20 bytes
-        tx_hash = lg["transactionHash"].hex()
-        bn = lg["blockNumber"]
-
-        # ABI decode do data
-        decoded = w3.codec.decode(["string","bytes32","uint256"], lg["data"])
-        metadata_uri, proof_hash_bytes, ts = decoded
-        proof_hash = "0x" + proof_hash_bytes.hex()
-
-        exists = sess.query(Pose).filter_by(tx_hash=tx_hash).first()
-        if not exists:
-            sess.add(Pose(
-                claim_hash=claim_hash,
-                submitter=submitter,
-                metadata_uri=metadata_uri,
-                proof_hash=proof_hash,
-                block_number=bn,
-                tx_hash=tx_hash,
-                timestamp=int(ts),
-            ))
-
-    # PoLE
-    pole_logs = fetch(args.pole, pole_topic, args.from_block)
-    for lg in pole_logs:
-        claim_hash = "0x" + lg["topics"][1].hex()[2:]
-        submitter  = "0x" + lg["topics"][2].hex()[26:]
-        tx_hash = lg["transactionHash"].hex()
-        bn = lg["blockNumber"]
-
-        decoded = w3.codec.decode(
-            ["uint8","uint256","uint256","uint256","uint256","bytes32","uint256"],
-            lg["data"]
-        )
-        verdict, omega_u6, psi_u6, cvar_u6, latency_ms, run_hash_bytes, ts = decoded
-        run_hash = "0x" + run_hash_bytes.hex()
-
-        exists = sess.query(Pole).filter_by(tx_hash=tx_hash).first()
-        if not exists:
-            sess.add(Pole(
-                claim_hash=claim_hash,
-                submitter=submitter,
-                verdict=int(verdict),
-                omega_u6=int(omega_u6),
-                psi_u6=int(psi_u6),
-                cvar_u6=int(cvar_u6),
-                latency_ms=int(latency_ms),
-                run_hash=run_hash,
-                block_number=bn,
-                tx_hash=tx_hash,
-                timestamp=int(ts),
-            ))
+    except ValueError as exc:
+        if hi <= lo or not range_too_large(exc):
+            raise
+        mid = (lo + hi) // 2
+        return fetch_logs(w3, addr, t0, lo, mid) + fetch_logs(w3, addr, t0, mid + 1, hi)
 
+def index_step(w3, sess, spec: dict, streams: list, head: int) -> dict:
+    """Avança cada cursor até ``batch_blocks`` blocos e grava linhas + cursores numa transação."""
+    counts = {}
+    now = int(time.time())
+    for model, addr, t0, decode in streams:
+        cursor = sess.get(IndexerCursor, (spec["chain_id"], addr))
+        lo = cursor.last_block + 1 if cursor else int(spec["from_block"])
+        hi = min(head, lo + int(spec["batch_blocks"]) - 1)
+        if hi < lo:
+            counts[model.__tablename__] = 0
+            continue
+        logs = fetch_logs(w3, addr, t0, lo, hi)
+        for lg in logs:
+            row = decode(w3, lg, spec["chain_id"], addr)
+            # Linhas migradas (contract desconhecido) contam como deste deployment
+            exists = sess.query(model).filter(
+                model.chain_id == row.chain_id,
+                model.tx_hash == row.tx_hash,
+                model.contract.in_((addr, LEGACY_CONTRACT)),
+            ).first()
+            if not exists:
+                sess.add(row)
+        if cursor is None:
+            cursor = IndexerCursor(chain_id=spec["chain_id"], contract=addr)
+            sess.add(cursor)
+        cursor.last_block = hi
+        cursor.updated_at = now
+        counts[model.__tablename__] = len(logs)
     sess.commit()
-    print(f"Indexed: PoSE logs={len(pose_logs)}, PoLE logs={len(pole_logs)}")
-    print("DB:", args.db)
+    return counts
+
+def caught_up(sess, spec: dict, streams: list, head: int) -> bool:
+    for _, addr, _, _ in streams:
+        cursor = sess.get(IndexerCursor, (spec["chain_id"], addr))
+        next_block = cursor.last_block + 1 if cursor else int(spec["from_block"])
+        if next_block <= head:
+            return False
+    return True
+
+def run_worker(spec: dict, db_path: str, follow: bool, legacy_chain_id: int = LEGACY_CHAIN_ID) -> None:
+    label = f"[{spec['chain']}/{spec['deployment']}]"
+    w3 = Web3(Web3.HTTPProvider(spec["rpc"]))
+    rpc_chain_id = w3.eth.chain_id
+    if rpc_chain_id != spec["chain_id"]:
+        raise RuntimeError(f"{label} RPC reports chain_id={rpc_chain_id}, config says {spec['chain_id']}")
+    Session = init_db(db_path, legacy_chain_id)
+    sess = Session()
+
+    streams = [
+        (Pose, Web3.to_checksum_address(spec["pose"]), topic(w3, POSE_EVENT), decode_pose),
+        (Pole, Web3.to_checksum_address(spec["pole"]), topic(w3, POLE_EVENT), decode_pole),
+    ]
+    totals = {"pose": 0, "pole": 0}
+    while True:
+        head = w3.eth.block_number - int(spec["confirmations"])
+        counts = index_step(w3, sess, spec, streams, head)
+        for k, v in counts.items():
+            totals[k] += v
+        if caught_up(sess, spec, streams, head):
+            if not follow:
+                break
+            time.sleep(float(spec["poll_seconds"]))
+
+    print(f"{label} Indexed: PoSE logs={totals['pose']}, PoLE logs={totals['pole']} (chain_id={spec['chain_id']})")
+    print(f"{label} DB:", db_path)
+
+def supervise(workers: list, db_path: str, follow: bool, legacy_chain_id: int, max_backoff: float = 60.0) -> int:
+    """Um processo por worker. Com --follow, reinicia quem cair (backoff exponencial)."""
+    # Cria/migra o schema uma vez antes de subir os workers concorrentes
+    init_db(db_path, legacy_chain_id)
+    procs: dict = {}
+    backoff = {i: 1.0 for i in range(len(workers))}
+    restart_at = {i: 0.0 for i in range(len(workers))}
+    failed = 0
+
+    def start(i: int) -> None:
+        p = mp.Process(target=run_worker, args=(workers[i], db_path, follow, legacy_chain_id), daemon=True)
+        p.start()
+        procs[i] = p
+
+    for i in range(len(workers)):
+        start(i)
+    try:
+        while procs:
+            time.sleep(0.5)
+            for i, p in list(procs.items()):
+                if p.is_alive():
+                    continue
+                del procs[i]
+                if p.exitcode == 0:
+                    backoff[i] = 1.0
+                    continue
+                w = workers[i]
+                print(f"[{w['chain']}/{w['deployment']}] worker exited with {p.exitcode}", file=sys.stderr)
+                if not follow:
+                    failed += 1
+                    continue
+                restart_at[i] = time.monotonic() + backoff[i]
+                backoff[i] = min(backoff[i] * 2, max_backoff)
+            if follow:
+                for i, t in restart_at.items():
+                    if i not in procs and t and time.monotonic() >= t:
+                        restart_at[i] = 0.0
+                        start(i)
+    except KeyboardInterrupt:
+        for p in procs.values():
+            p.terminate()
+        return 130
+    return 1 if failed else 0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--config", default=None, help="YAML multi-chain (ver indexer/chains.example.yaml)")
+    ap.add_argument("--rpc")
+    ap.add_argument("--pose")
+    ap.add_argument("--pole")
+    ap.add_argument("--chain-id", type=int, default=None, help="Default: chain_id reportado pelo RPC")
+    ap.add_argument("--db", default=None)
+    ap.add_argument("--from-block", type=int, default=0)
+    ap.add_argument("--follow", action="store_true", help="Continua acompanhando novos blocos")
+    args = ap.parse_args()
+
+    if args.config:
+        cfg, workers = load_config(args.config)
+        db_path = args.db or cfg["db"]
+        legacy_chain_id = int(cfg.get("legacy_chain_id", LEGACY_CHAIN_ID))
+    else:
+        if not (args.rpc and args.pose and args.pole and args.db):
+            ap.error("--rpc, --pose, --pole and --db are required without --config")
+        chain_id = args.chain_id or Web3(Web3.HTTPProvider(args.rpc)).eth.chain_id
+        workers = [{
+            **DEFAULTS,
+            "chain": str(chain_id),
+            "chain_id": chain_id,
+            "rpc": args.rpc,
+            "deployment": "default",
+            "pose": args.pose,
+            "pole": args.pole,
+            "from_block": args.from_block,
+        }]
+        db_path = args.db
+        legacy_chain_id = chain_id
+
+    if len(workers) == 1 and not args.follow:
+        # Caso simples (cron/devnet): sem processo extra
+        init_db(db_path, legacy_chain_id)
+        run_worker(workers[0], db_path, False, legacy_chain_id)
+        return
+    raise SystemExit(supervise(workers, db_path, args.follow, legacy_chain_id))
 
 if __name__ == "__main__":
     main()
@@ -6,27 +6,52 @@ API to compute canonical hashes. No remote code execution happens here.
 """
 
 import os
+import re
 from datetime import datetime
+from functools import lru_cache
 
 import pandas as pd
 import gradio as gr
 from fastapi import FastAPI
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 
+from bench_refresher import BenchmarkRefresher
 from benchmarks_core import load_core_benchmarks
 from capt_api import router as capt_router
+from shard_db import SHARD_TABLES, default_shard_set
 
 
 DB_PATH = os.environ.get("MATVERSE_DB", "matversescan.db")
+# Shards incrementais (shards.json): pose/pole viram views sobre os shards anexados
+SHARDS = default_shard_set()
 DASHBOARD_URL = "https://app.base44.com/apps/693d491d7d92782a1a55f89e/editor/preview/Dashboard"
 CAPT_DASHBOARD_URL = (
     "https://app.base44.com/apps/694471aafc033d574cd4579f/editor/preview/Dashboard"
 )
 
+# Benchmarks do core: atualizados em background, a UI só lê a cópia em memória
+core_bench_refresher = BenchmarkRefresher(
+    load_core_benchmarks,
+    interval=float(os.environ.get("CORE_REFRESH_SECONDS", "300")),
+)
+
 
+@lru_cache(maxsize=1)
 def _engine():
-    # engine por chamada é ok em DB pequeno; helper facilita evoluir
-    return create_engine(f"sqlite:///{DB_PATH}")
+    # engine único: com shards, o ATTACH + views rodam uma vez por conexão do pool
+    if SHARDS is None:
+        return create_engine(f"sqlite:///{DB_PATH}")
+    url = f"sqlite:///{DB_PATH}" if os.path.exists(DB_PATH) else "sqlite://"
+    eng = create_engine(url, connect_args={"uri": True})
+    event.listen(eng, "connect", lambda dbapi_conn, _: SHARDS.attach(dbapi_conn))
+    return eng
+
+
+def _order_by(table: str) -> str:
+    # views de shards não têm rowid; block_number dá a mesma ordem de inserção
+    if SHARDS is not None and table in SHARD_TABLES:
+        return "block_number DESC"
+    return "rowid DESC"
 
 
 def q(sql: str, params=None):
@@ -75,7 +100,7 @@ def find_claim(claim_hash: str):
 
 
 def list_core_benchmarks():
-    rows = load_core_benchmarks()
+    rows = core_bench_refresher.rows()
     table = []
     for r in rows:
         table.append(
@@ -100,7 +125,8 @@ def list_tables():
         rows = c.execute(
             text(
                 "SELECT name FROM sqlite_schema WHERE type='table' "
-                "AND name NOT LIKE 'sqlite_%' ORDER BY name"
+                "AND name NOT LIKE 'sqlite_%' AND name NOT LIKE 'pose_fts%' "
+                "UNION SELECT name FROM sqlite_temp_schema WHERE type='view' ORDER BY name"
             )
         ).fetchall()
         return [r[0] for r in rows]
@@ -113,19 +139,41 @@ def table_info(table: str):
         return [(row[1], row[2]) for row in info_rows]
 
 
-def preview_table(table: str, limit: int):
+def list_chains():
+    # DISTINCT sobre ix_*_chain_block: só percorre o índice
+    tables = [t for t in ("pose", "pole") if t in list_tables() and _has_chain(t)]
+    if not tables:
+        return []
+    sql = " UNION ".join(f"SELECT DISTINCT chain_id FROM {t}" for t in tables)
+    return [r["chain_id"] for r in q(sql + " ORDER BY 1") if r["chain_id"] is not None]
+
+
+def _has_chain(table: str) -> bool:
+    return any(col == "chain_id" for col, _ in table_info(table))
+
+
+def _chain_filter(table: str, chain_id) -> str:
+    """Condição SQL (com :chain) quando há filtro de chain e a tabela tem a coluna."""
+    if chain_id in (None, "") or not _has_chain(table):
+        return ""
+    return "chain_id = :chain"
+
+
+def preview_table(table: str, limit: int, chain_id=None):
     if not table:
         return pd.DataFrame()
+    cond = _chain_filter(table, chain_id)
+    where = f"WHERE {cond} " if cond else ""
     eng = _engine()
     with eng.connect() as c:
         return pd.read_sql(
-            text(f'SELECT * FROM "{table}" ORDER BY rowid DESC LIMIT :limit'),
+            text(f'SELECT * FROM "{table}" {where}ORDER BY {_order_by(table)} LIMIT :limit'),
             c,
-            params={"limit": limit},
+            params={"limit": limit, "chain": chain_id},
         )
 
 
-def search_hash(fragment: str, limit: int):
+def search_hash(fragment: str, limit: int, chain_id=None):
     if not fragment:
         return {}
 
@@ -142,15 +190,17 @@ def search_hash(fragment: str, limit: int):
             and ("CHAR" in col_type.upper() or "TEXT" in col_type.upper() or col.endswith("hash"))
         ]
 
+        cond = _chain_filter(table, chain_id)
+        and_chain = f" AND {cond}" if cond else ""
         table_matches = []
         with eng.connect() as c:
             for col in searchable_cols:
                 rows = c.execute(
                     text(
-                        f'SELECT * FROM "{table}" WHERE "{col}" LIKE :pattern '
-                        "ORDER BY rowid DESC LIMIT :limit"
+                        f'SELECT * FROM "{table}" WHERE "{col}" LIKE :pattern{and_chain} '
+                        f"ORDER BY {_order_by(table)} LIMIT :limit"
                     ),
-                    {"pattern": pattern, "limit": limit},
+                    {"pattern": pattern, "limit": limit, "chain": chain_id},
                 ).fetchall()
                 if rows:
                     table_matches.extend([dict(r._mapping) for r in rows])
@@ -161,6 +211,64 @@ def search_hash(fragment: str, limit: int):
     return results
 
 
+def fts_query(text_in: str) -> str:
+    """Texto livre -> consulta FTS5: cada termo (separado por espaço) vira uma frase com os
+    mesmos tokens do índice, todas em AND; o último token do último termo casa por prefixo.
+
+    "huggingface.co models/w" -> '"huggingface co" "models w" *'
+    """
+    phrases = []
+    for term in text_in.split():
+        tokens = re.findall(r"\w+", term)
+        if tokens:
+            phrases.append('"' + " ".join(tokens) + '"')
+    if not phrases:
+        return ""
+    return " ".join(phrases) + " *"
+
+
+def _fts_schemas(c) -> list[str]:
+    schemas = [f"shard_{i}" for i in range(len(SHARDS.files))] if SHARDS is not None else ["main"]
+    return [
+        s
+        for s in schemas
+        if c.execute(text(f"SELECT 1 FROM {s}.sqlite_master WHERE type='table' AND name='pose_fts'")).first()
+    ]
+
+
+def search_metadata(text_in: str, limit: int = 20, chain_id=None):
+    """Busca ranqueada (bm25) por tokens de host/path em pose.metadata_uri via FTS5."""
+    match = fts_query(text_in or "")
+    if not match:
+        return []
+    eng = _engine()
+    with eng.connect() as c:
+        schemas = _fts_schemas(c)
+        if not schemas:
+            return []
+        cond = _chain_filter("pose", chain_id)
+        and_chain = f" AND p.{cond}" if cond else ""
+        chain_col = "p.chain_id, " if _has_chain("pose") else ""
+        # Com shards, cada um tem seu índice; bm25 é por shard, o merge ordena pelo rank
+        parts = [
+            f"SELECT {chain_col}p.claim_hash, p.metadata_uri, p.block_number, p.tx_hash, "
+            "highlight(pose_fts, 0, '[', ']') AS match, pose_fts.rank AS rank "
+            f"FROM {s}.pose_fts JOIN {s}.pose p ON p.id = pose_fts.rowid "
+            f"WHERE pose_fts MATCH :match{and_chain}"
+            for s in schemas
+        ]
+        sql = "SELECT * FROM (" + " UNION ALL ".join(parts) + ") ORDER BY rank LIMIT :limit"
+        rows = c.execute(text(sql), {"match": match, "limit": int(limit), "chain": chain_id}).fetchall()
+        return [dict(r._mapping) for r in rows]
+
+
+ALL_CHAINS = "todas"
+
+
+def _chain_arg(value: str):
+    return None if value in (None, "", ALL_CHAINS) else int(value)
+
+
 def app_ui():
     with gr.Blocks(
         title="MatVerseScan — Proof Explorer", css=".gradio-container {max-width: 1200px;}"
@@ -178,6 +286,12 @@ def app_ui():
         with gr.Tabs():
             # ===== TAB 1: Proof Explorer (o que você já tem) =====
             with gr.Tab("Proof Explorer"):
+                chain_dropdown = gr.Dropdown(
+                    choices=[ALL_CHAINS] + [str(c) for c in list_chains()],
+                    value=ALL_CHAINS,
+                    label="Chain (chain_id)",
+                    interactive=True,
+                )
                 with gr.Row():
                     with gr.Column(scale=1):
                         gr.Markdown("## 1) Tabelas")
@@ -207,19 +321,26 @@ def app_ui():
                         search_btn = gr.Button("Buscar")
                         search_results = gr.JSON(label="Resultados")
 
-                def _select(table: str, limit: int):
+                        gr.Markdown("## 3) Busca em metadata_uri (host/path)")
+                        uri_input = gr.Textbox(
+                            label="Termos", placeholder="ex.: huggingface.co models/weights", lines=1
+                        )
+                        uri_limit = gr.Slider(label="Limite", minimum=5, maximum=200, step=5, value=20)
+                        uri_btn = gr.Button("Buscar URI")
+                        uri_results = gr.Dataframe(label="Resultados (ordenados por relevância)", interactive=False)
+
+                def _select(table: str, limit: int, chain: str):
                     if not table:
                         return gr.update(), pd.DataFrame(), pd.DataFrame()
                     meta = pd.DataFrame(table_info(table), columns=["coluna", "tipo"])
-                    preview = preview_table(table, limit)
+                    preview = preview_table(table, limit, _chain_arg(chain))
                     return table, meta, preview
 
-                table_dropdown.change(
-                    _select, [table_dropdown, limit_slider], [table_dropdown, table_meta, table_preview]
-                )
-                limit_slider.change(
-                    _select, [table_dropdown, limit_slider], [table_dropdown, table_meta, table_preview]
-                )
+                select_inputs = [table_dropdown, limit_slider, chain_dropdown]
+                select_outputs = [table_dropdown, table_meta, table_preview]
+                table_dropdown.change(_select, select_inputs, select_outputs)
+                limit_slider.change(_select, select_inputs, select_outputs)
+                chain_dropdown.change(_select, select_inputs, select_outputs)
 
                 def _refresh_tables():
                     tables_list = list_tables()
@@ -232,10 +353,16 @@ def app_ui():
 
                 refresh_tables.click(_refresh_tables, None, [table_dropdown, tables_state])
 
-                def _search(fragment: str, limit: int):
-                    return search_hash(fragment, limit)
+                def _search(fragment: str, limit: int, chain: str):
+                    return search_hash(fragment, limit, _chain_arg(chain))
 
-                search_btn.click(_search, [hash_input, hash_limit], search_results)
+                search_btn.click(_search, [hash_input, hash_limit, chain_dropdown], search_results)
+
+                def _search_uri(terms: str, limit: int, chain: str):
+                    return pd.DataFrame(search_metadata(terms, limit, _chain_arg(chain)))
+
+                uri_btn.click(_search_uri, [uri_input, uri_limit, chain_dropdown], uri_results)
+                uri_input.submit(_search_uri, [uri_input, uri_limit, chain_dropdown], uri_results)
 
             # ===== TAB 2: Dashboard Espelho =====
             with gr.Tab("Dashboard (Espelho)"):
@@ -273,9 +400,13 @@ def app_ui():
 
                     **Endpoints CAPT**
                     - `POST /capt/chromeos/capture`
+                    - `GET /capt/chromeos/metrics?window=300`
                     - `POST /capt/terabox/measure`
                     - `GET /capt/runtime/status`
                     - `POST /capt/benchmark/freeze`
+                    - `POST /capt/benchmark/freeze/batch` (NDJSON)
+                    - `GET /capt/benchmark/freezes?since=&until=&key=&value=`
+                    - `GET /capt/benchmark/freezes/verify`
                     """
                 )
 
@@ -297,6 +428,7 @@ def app_ui():
             f"""
             ---
             **Snapshot carregado:** `{os.path.abspath(DB_PATH)}`  
+            **Shards:** {", ".join(f"chain {c['chain_id']}: {len(c['blocks'])}" for c in SHARDS.chains) if SHARDS else "—"}  
             **Última atualização (container):** {datetime.utcnow().isoformat(timespec='seconds')} UTC
             """
         )
@@ -307,6 +439,35 @@ def app_ui():
 fastapi_app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None)
 fastapi_app = FastAPI()
 fastapi_app.include_router(capt_router)
+
+
+@fastapi_app.get("/core/benchmarks/status")
+async def core_benchmarks_status() -> dict:
+    return core_bench_refresher.status()
+
+
+@fastapi_app.get("/scan/search/metadata")
+def search_metadata_endpoint(q: str, limit: int = 20, chain_id: int | None = None) -> dict:
+    rows = search_metadata(q, max(1, min(limit, 200)), chain_id)
+    return {"query": fts_query(q), "results": rows}
+
+
+@fastapi_app.get("/scan/shards/status")
+async def shards_status() -> dict:
+    return SHARDS.status() if SHARDS is not None else {"shards": 0}
+
+
+@fastapi_app.on_event("startup")
+async def _start_core_refresher() -> None:
+    # No startup, não no import: o forkserver do pool local importa este módulo
+    core_bench_refresher.start()
+
+
+@fastapi_app.on_event("shutdown")
+async def _stop_core_refresher() -> None:
+    core_bench_refresher.stop(timeout=1.0)
+
+
 app = gr.mount_gradio_app(fastapi_app, app_ui(), path="/")
 
 
@@ -0,0 +1,120 @@
+"""Background refresher for core benchmark rows (stale-while-revalidate).
+
+The UI never calls the loader on the request path: a daemon thread keeps the
+latest ``BenchRow`` list in memory and revalidates it on an interval with jitter.
+Failures keep serving the previous (stale) copy and retry with exponential backoff.
+"""
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks_core import BenchRow
+
+
+class BenchmarkRefresher:
+    def __init__(
+        self,
+        loader: Callable[[], List[BenchRow]],
+        interval: float = 300.0,
+        jitter: float = 0.1,
+        retry_base: float = 15.0,
+        max_backoff: float = 3600.0,
+    ):
+        self.loader = loader
+        self.interval = interval
+        self.jitter = jitter
+        self.retry_base = retry_base
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._loaded = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._rows: List[BenchRow] = []
+        self._refreshed_at: Optional[float] = None
+        self._refreshing = False
+        self.refreshes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> "BenchmarkRefresher":
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="core-bench-refresher", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def trigger(self) -> None:
+        """Ask the background thread to revalidate now (non-blocking)."""
+        self._wake.set()
+
+    def rows(self, wait: float = 0.0) -> List[BenchRow]:
+        """Latest rows, possibly stale; optionally wait up to ``wait`` s for the first load."""
+        if wait > 0:
+            self._loaded.wait(wait)
+        with self._lock:
+            return list(self._rows)
+
+    def refresh_now(self) -> bool:
+        with self._lock:
+            self._refreshing = True
+        try:
+            rows = self.loader()
+        except Exception as exc:  # mantém a cópia antiga e registra a falha
+            with self._lock:
+                self.failures += 1
+                self.consecutive_failures += 1
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                self._refreshing = False
+            return False
+
+        with self._lock:
+            self._rows = list(rows)
+            self._refreshed_at = time.time()
+            self.refreshes += 1
+            self.consecutive_failures = 0
+            self.last_error = None
+            self._refreshing = False
+        self._loaded.set()
+        return True
+
+    def next_delay(self) -> float:
+        if self.consecutive_failures:
+            base = min(self.max_backoff, self.retry_base * 2 ** (self.consecutive_failures - 1))
+        else:
+            base = self.interval
+        return base * random.uniform(1.0 - self.jitter, 1.0 + self.jitter)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self.refresh_now()
+            self._wake.wait(self.next_delay())
+            self._wake.clear()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            age = time.time() - self._refreshed_at if self._refreshed_at is not None else None
+            return {
+                "rows": len(self._rows),
+                "refreshing": self._refreshing,
+                "last_refresh_at": self._refreshed_at,
+                "last_refresh_age_s": round(age, 3) if age is not None else None,
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+                "consecutive_failures": self.consecutive_failures,
+                "last_error": self.last_error,
+            }
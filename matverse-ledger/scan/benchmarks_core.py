@@ -1,20 +1,37 @@
-"""GitHub-backed loader for matverse-core benchmark artifacts (data-only).
+"""Loader for matverse-core benchmark artifacts (GitHub API or local mirror, data-only).
 
 This module reads public JSON artifacts from the matverse-core repository via the
 GitHub API, canonicalizes the observable matrix ``M`` and computes ``H(M)`` to
 cross-check against the expected hash published in ``expected_output.json``.
 No remote code execution occurs here; the verifier is intentionally deterministic
-and side-effect free beyond HTTP requests.
+and side-effect free beyond HTTP requests and the local artifact cache.
+
+``CORE_LOCAL_PATH`` switches to an offline backend (local mirror, git checkout or
+tarball) that verifies benchmarks in parallel without any network access.
+
+GitHub refreshes are incremental: listings are fetched with ``If-None-Match`` and the
+small parsed artifacts, ``H(M)`` + metrics of ``M`` and whole rows are cached by GitHub
+blob/tree SHA, so an unchanged benchmark set costs a single conditional request. ``M``
+itself is never cached (it can be larger than the whole cache budget).
 """
 
 import hashlib
 import json
+import multiprocessing
 import os
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+import subprocess
+import tarfile
+import tempfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 
+from core_cache import ArtifactCache, default_cache
+from scripts.canonical_json import canonical_bytes, canonical_sha256
+
 
 @dataclass
 class BenchRow:
@@ -30,19 +47,19 @@ class BenchRow:
 
 
 def canon_bytes(data: Dict[str, Any]) -> bytes:
-    # Canonização idêntica ao core: sort_keys + separators
-    return json.dumps(
-        data,
-        sort_keys=True,
-        separators=(",", ":"),
-        ensure_ascii=False,
-    ).encode("utf-8")
+    # Canonização idêntica ao core: sort_keys + separators, sem escapar não-ASCII
+    return canonical_bytes(data, ensure_ascii=False)
 
 
 def sha256_hex(b: bytes) -> str:
     return hashlib.sha256(b).hexdigest()
 
 
+def canon_sha256_hex(data: Dict[str, Any], chunk_chars: int = 1 << 16) -> str:
+    """``sha256_hex(canon_bytes(data))`` without materializing the canonical JSON."""
+    return canonical_sha256(data, ensure_ascii=False, chunk_chars=chunk_chars)
+
+
 def gh_headers() -> Dict[str, str]:
     # Opcional: evita rate-limit em deploy (HF Spaces, etc.)
     token = os.getenv("GITHUB_TOKEN", "").strip()
@@ -52,103 +69,335 @@ def gh_headers() -> Dict[str, str]:
     return h
 
 
-def gh_contents(owner: str, repo: str, path: str, ref: str) -> List[Dict[str, Any]]:
+def gh_contents(
+    owner: str, repo: str, path: str, ref: str, cache: Optional[ArtifactCache] = None
+) -> List[Dict[str, Any]]:
     url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}?ref={ref}"
-    r = requests.get(url, headers=gh_headers(), timeout=20)
+    headers = gh_headers()
+    key = f"contents:{url}"
+    cached = cache.get(key) if cache is not None else None
+    if cached and cached.get("etag"):
+        # 304 não consome rate-limit em requisições autenticadas
+        headers["If-None-Match"] = cached["etag"]
+
+    r = requests.get(url, headers=headers, timeout=20)
+    if r.status_code == 304 and cached is not None:
+        return cached["data"]
     r.raise_for_status()
     data = r.json()
     if not isinstance(data, list):
         raise RuntimeError(f"GitHub contents API unexpected payload at {path}")
+    etag = r.headers.get("ETag")
+    if cache is not None and etag:
+        cache.put(key, {"etag": etag, "data": data})
     return data
 
 
-def gh_download_json(download_url: str) -> Dict[str, Any]:
+def gh_download_json(
+    download_url: str, sha: Optional[str] = None, cache: Optional[ArtifactCache] = None
+) -> Dict[str, Any]:
+    # Blob SHA identifica o conteúdo: se já vimos esse SHA, não baixa de novo
+    key = f"blob:{sha}" if sha else ""
+    if cache is not None and key:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached["data"]
+
     r = requests.get(download_url, headers=gh_headers(), timeout=20)
     r.raise_for_status()
-    return r.json()
+    data = r.json()
+    if cache is not None and key:
+        cache.put(key, {"data": data})
+    return data
 
 
-def _pick_download_url(entries: List[Dict[str, Any]], filename: str) -> Optional[str]:
+def _pick_entry(entries: List[Dict[str, Any]], filename: str) -> Optional[Dict[str, Any]]:
     for it in entries:
-        if it.get("type") == "file" and it.get("name") == filename:
-            return it.get("download_url")
+        if it.get("type") == "file" and it.get("name") == filename and it.get("download_url"):
+            return it
     return None
 
 
-def load_core_benchmarks() -> List[BenchRow]:
-    owner = os.getenv("CORE_OWNER", "Symbios-Matverse")
-    repo = os.getenv("CORE_REPO", "matverse-core")
-    ref = os.getenv("CORE_REF", "main")
-    root = os.getenv("CORE_BENCH_ROOT", "benchmarks")
+def _download_entry(entry: Dict[str, Any], cache: Optional[ArtifactCache]) -> Dict[str, Any]:
+    return gh_download_json(entry["download_url"], entry.get("sha"), cache)
+
+
+def _m_summary(m_entry: Dict[str, Any], cache: Optional[ArtifactCache]) -> Tuple[str, Dict[str, Any]]:
+    """``(H(M), metrics)`` for an ``M_canonical.json`` entry, cached by blob SHA.
+
+    Only the hash and the metrics go to the cache: caching the parsed matrix would
+    evict the ETag and row entries that keep refreshes cheap.
+    """
+    sha = m_entry.get("sha")
+    key = f"m:{sha}" if sha else ""
+    if cache is not None and key:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached["h_m"], cached["metrics"]
+    M = gh_download_json(m_entry["download_url"])
+    h_m, metrics = canon_sha256_hex(M), _metrics(M)
+    if cache is not None and key:
+        cache.put(key, {"h_m": h_m, "metrics": metrics})
+    return h_m, metrics
+
+
+def _metrics(M: Dict[str, Any]) -> Dict[str, Any]:
+    metrics = M.get("metrics", {})
+    return dict(metrics) if isinstance(metrics, dict) else {}
+
+
+SPEC_FILE = "claim_v1.0.0.json"
+EXPECTED_FILE = "expected_output.json"
+M_FILE = "M_canonical.json"
+
+
+def _incomplete_row(
+    bench_dir: str, spec: Optional[Dict[str, Any]], exp: Optional[Dict[str, Any]]
+) -> BenchRow:
+    # Degrada com transparência: se faltar algo, aparece como FAIL com “note”
+    claim_id = "UNKNOWN"
+    version = "UNKNOWN"
+    frozen_date = ""
+    if spec is not None:
+        claim_id = str(spec.get("claim_id", "UNKNOWN"))
+        version = str(spec.get("version", "UNKNOWN"))
+        frozen_date = str(spec.get("frozen_date", ""))
+
+    h_m_expected = ""
+    if exp is not None:
+        h_m_expected = str(exp.get("h_m", ""))
+
+    return BenchRow(
+        bench_dir=bench_dir,
+        claim_id=claim_id,
+        version=version,
+        frozen_date=frozen_date,
+        h_m_calc="",
+        h_m_expected=h_m_expected,
+        match=False,
+        metrics={},
+        note="incomplete: missing files in spec/ or observable/",
+    )
+
+
+def _verified_row(
+    bench_dir: str,
+    spec: Dict[str, Any],
+    exp: Dict[str, Any],
+    h_m_calc: str,
+    metrics: Dict[str, Any],
+) -> BenchRow:
+    h_m_expected = str(exp.get("h_m", ""))
+    return BenchRow(
+        bench_dir=bench_dir,
+        claim_id=str(spec.get("claim_id", "")),
+        version=str(spec.get("version", "")),
+        frozen_date=str(spec.get("frozen_date", "")),
+        h_m_calc=h_m_calc,
+        h_m_expected=h_m_expected,
+        match=h_m_calc == h_m_expected,
+        metrics=metrics,
+        note=str(exp.get("note", "")),
+    )
+
+
+class BenchmarkSource(ABC):
+    """Where benchmark artifacts come from; every backend yields identical ``BenchRow``s."""
+
+    @abstractmethod
+    def load_rows(self) -> List[BenchRow]:
+        ...
+
+
+class GitHubBenchmarkSource(BenchmarkSource):
+    def __init__(
+        self,
+        owner: str,
+        repo: str,
+        ref: str,
+        root: str,
+        cache: Optional[ArtifactCache] = None,
+    ):
+        self.owner = owner
+        self.repo = repo
+        self.ref = ref
+        self.root = root
+        self.cache = cache
+
+    def load_rows(self) -> List[BenchRow]:
+        cache = self.cache
+        entries = gh_contents(self.owner, self.repo, self.root, self.ref, cache)
+        bench_dirs = [e for e in entries if e.get("type") == "dir"]
+
+        rows: List[BenchRow] = []
 
-    entries = gh_contents(owner, repo, root, ref)
-    bench_dirs = [e for e in entries if e.get("type") == "dir"]
+        for d in sorted(bench_dirs, key=lambda x: x.get("name", "")):
+            bench_dir = d.get("name", "")
 
-    rows: List[BenchRow] = []
+            # Tree SHA inalterado => diretório inteiro inalterado: reusa a linha sem nenhum request
+            row_key = f"row:{d['sha']}:{bench_dir}" if d.get("sha") else ""
+            if cache is not None and row_key:
+                cached_row = cache.get(row_key)
+                if cached_row is not None:
+                    rows.append(BenchRow(**cached_row))
+                    continue
 
-    for d in sorted(bench_dirs, key=lambda x: x.get("name", "")):
-        bench_dir = d.get("name", "")
+            row = self._load_row(bench_dir)
+            if cache is not None and row_key:
+                cache.put(row_key, asdict(row))
+            rows.append(row)
 
+        return rows
+
+    def _load_row(self, bench_dir: str) -> BenchRow:
+        cache = self.cache
+        base = f"{self.root}/{bench_dir}"
         # Cada benchmark precisa: spec/claim_v1.0.0.json + observable/expected_output.json + observable/M_canonical.json
-        spec_entries = gh_contents(owner, repo, f"{root}/{bench_dir}/spec", ref)
-        obs_entries = gh_contents(owner, repo, f"{root}/{bench_dir}/observable", ref)
-
-        spec_url = _pick_download_url(spec_entries, "claim_v1.0.0.json")
-        exp_url = _pick_download_url(obs_entries, "expected_output.json")
-        m_url = _pick_download_url(obs_entries, "M_canonical.json")
-
-        # Degrada com transparência: se faltar algo, aparece como FAIL com “note”
-        if not spec_url or not exp_url or not m_url:
-            claim_id = "UNKNOWN"
-            version = "UNKNOWN"
-            frozen_date = ""
-            if spec_url:
-                spec = gh_download_json(spec_url)
-                claim_id = str(spec.get("claim_id", "UNKNOWN"))
-                version = str(spec.get("version", "UNKNOWN"))
-                frozen_date = str(spec.get("frozen_date", ""))
-
-            h_m_expected = ""
-            note = "incomplete: missing files in spec/ or observable/"
-            if exp_url:
-                exp = gh_download_json(exp_url)
-                h_m_expected = str(exp.get("h_m", ""))
-
-            rows.append(
-                BenchRow(
-                    bench_dir=bench_dir,
-                    claim_id=claim_id,
-                    version=version,
-                    frozen_date=frozen_date,
-                    h_m_calc="",
-                    h_m_expected=h_m_expected,
-                    match=False,
-                    metrics={},
-                    note=note,
+        spec_entries = gh_contents(self.owner, self.repo, f"{base}/spec", self.ref, cache)
+        obs_entries = gh_contents(self.owner, self.repo, f"{base}/observable", self.ref, cache)
+
+        spec_entry = _pick_entry(spec_entries, SPEC_FILE)
+        exp_entry = _pick_entry(obs_entries, EXPECTED_FILE)
+        m_entry = _pick_entry(obs_entries, M_FILE)
+
+        if not spec_entry or not exp_entry or not m_entry:
+            spec = _download_entry(spec_entry, cache) if spec_entry else None
+            exp = _download_entry(exp_entry, cache) if exp_entry else None
+            return _incomplete_row(bench_dir, spec, exp)
+
+        spec = _download_entry(spec_entry, cache)
+        exp = _download_entry(exp_entry, cache)
+        return _verified_row(bench_dir, spec, exp, *_m_summary(m_entry, cache))
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def verify_local_bench(bench_root: str, bench_dir: str) -> BenchRow:
+    """Verify one ``<bench_root>/<bench_dir>`` from disk (top-level so process pools can pickle it)."""
+    base = os.path.join(bench_root, bench_dir)
+    spec = _read_json(os.path.join(base, "spec", SPEC_FILE))
+    exp = _read_json(os.path.join(base, "observable", EXPECTED_FILE))
+    M = _read_json(os.path.join(base, "observable", M_FILE))
+
+    if spec is None or exp is None or M is None:
+        return _incomplete_row(bench_dir, spec, exp)
+    return _verified_row(bench_dir, spec, exp, canon_sha256_hex(M), _metrics(M))
+
+
+# O pool é criado a partir da thread do refresher, dentro de um processo com várias threads
+# (uvicorn, sampler, escritora de freezes): fork herdaria locks presos por elas. forkserver
+# faz os fork a partir de um servidor limpo; como no spawn, cada worker reimporta o __main__.
+_POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def _verify_local_bench_args(args: Tuple[str, str]) -> BenchRow:
+    return verify_local_bench(*args)
+
+
+class LocalBenchmarkSource(BenchmarkSource):
+    """Offline backend: a local mirror / git checkout, a tarball, or a git ref of a checkout.
+
+    ``path`` may be a directory containing ``<root>/`` (a checkout of matverse-core),
+    a ``.tar``/``.tar.gz``/``.tgz`` archive (GitHub tarballs with a single top-level
+    directory are handled), or a git checkout combined with ``git_ref`` to verify a
+    commit other than the working tree. Benchmarks are verified in parallel across a
+    process pool.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        root: str = "benchmarks",
+        git_ref: Optional[str] = None,
+        workers: Optional[int] = None,
+    ):
+        self.path = path
+        self.root = root
+        self.git_ref = git_ref
+        self.workers = workers
+
+    def load_rows(self) -> List[BenchRow]:
+        if self.git_ref:
+            with tempfile.TemporaryDirectory(prefix="mvcore_") as tmp:
+                archive = os.path.join(tmp, "core.tar")
+                subprocess.run(
+                    ["git", "-C", self.path, "archive", "--format=tar", "-o", archive, self.git_ref],
+                    check=True,
                 )
-            )
-            continue
+                return self._load_tarball(archive)
 
-        spec = gh_download_json(spec_url)
-        exp = gh_download_json(exp_url)
-        M = gh_download_json(m_url)
+        if os.path.isfile(self.path) and tarfile.is_tarfile(self.path):
+            return self._load_tarball(self.path)
 
-        h_m_calc = sha256_hex(canon_bytes(M))
-        h_m_expected = str(exp.get("h_m", ""))
-        match = h_m_calc == h_m_expected
-
-        rows.append(
-            BenchRow(
-                bench_dir=bench_dir,
-                claim_id=str(spec.get("claim_id", "")),
-                version=str(spec.get("version", "")),
-                frozen_date=str(spec.get("frozen_date", "")),
-                h_m_calc=h_m_calc,
-                h_m_expected=h_m_expected,
-                match=match,
-                metrics=dict(M.get("metrics", {})) if isinstance(M.get("metrics", {}), dict) else {},
-                note=str(exp.get("note", "")),
-            )
+        return self._load_dir(self.path)
+
+    def _load_tarball(self, archive: str) -> List[BenchRow]:
+        with tempfile.TemporaryDirectory(prefix="mvcore_") as tmp:
+            with tarfile.open(archive) as tf:
+                tf.extractall(tmp, filter="data")
+            return self._load_dir(tmp)
+
+    def _bench_root(self, base: str) -> str:
+        bench_root = os.path.join(base, self.root)
+        if os.path.isdir(bench_root):
+            return bench_root
+        # Tarball do GitHub: <repo>-<ref>/benchmarks/...
+        children = [c for c in os.listdir(base) if os.path.isdir(os.path.join(base, c))]
+        if len(children) == 1:
+            nested = os.path.join(base, children[0], self.root)
+            if os.path.isdir(nested):
+                return nested
+        raise FileNotFoundError(f"benchmark root '{self.root}' not found under {base}")
+
+    def _load_dir(self, base: str) -> List[BenchRow]:
+        bench_root = self._bench_root(base)
+        bench_dirs = sorted(
+            name for name in os.listdir(bench_root) if os.path.isdir(os.path.join(bench_root, name))
         )
+        tasks = [(bench_root, name) for name in bench_dirs]
+
+        workers = self.workers or os.cpu_count() or 1
+        if workers <= 1 or len(tasks) <= 1:
+            return [verify_local_bench(*t) for t in tasks]
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=_POOL_CONTEXT) as pool:
+            chunksize = max(1, len(tasks) // (workers * 4))
+            return list(pool.map(_verify_local_bench_args, tasks, chunksize=chunksize))
+
+
+def default_source(cache: Optional[ArtifactCache] = None) -> BenchmarkSource:
+    """Backend from env: ``CORE_LOCAL_PATH`` selects the offline source, otherwise GitHub."""
+    root = os.getenv("CORE_BENCH_ROOT", "benchmarks")
+
+    local_path = os.getenv("CORE_LOCAL_PATH", "").strip()
+    if local_path:
+        workers = os.getenv("CORE_WORKERS", "").strip()
+        return LocalBenchmarkSource(
+            local_path,
+            root=root,
+            git_ref=os.getenv("CORE_LOCAL_REF", "").strip() or None,
+            workers=int(workers) if workers else None,
+        )
+
+    return GitHubBenchmarkSource(
+        owner=os.getenv("CORE_OWNER", "Symbios-Matverse"),
+        repo=os.getenv("CORE_REPO", "matverse-core"),
+        ref=os.getenv("CORE_REF", "main"),
+        root=root,
+        cache=cache if cache is not None else default_cache(),
+    )
+
 
-    return rows
+def load_core_benchmarks(
+    cache: Optional[ArtifactCache] = None, source: Optional[BenchmarkSource] = None
+) -> List[BenchRow]:
+    if source is None:
+        source = default_source(cache)
+    return source.load_rows()
@@ -2,28 +2,42 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
-from typing import Any
+import time
+from typing import Any, AsyncIterator
 
-from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from fastapi import APIRouter
 
 from capt.measurement.benchmark_freeze import CAPTBenchmarkFreezeStore
+from capt.measurement.freeze_log import DurableBenchmarkFreezeStore, FreezeStoreUnavailable
 from capt.runtime.governed_client import ChromeOSRuntimeGovernor
 
 
 MAX_PAYLOAD_BYTES = int(os.environ.get("CAPT_MAX_PAYLOAD_BYTES", "8192"))
 MAX_PAYLOAD_KEYS = int(os.environ.get("CAPT_MAX_PAYLOAD_KEYS", "64"))
+MAX_BATCH_BYTES = int(os.environ.get("CAPT_MAX_BATCH_BYTES", str(4 * 1024 * 1024)))
+BATCH_CHUNK = 256
+SAMPLE_INTERVAL = float(os.environ.get("CAPT_SAMPLE_INTERVAL", "5"))
+METRICS_CAPACITY = int(os.environ.get("CAPT_METRICS_CAPACITY", "86400"))
+DATASETS_FULL_REFRESH = float(os.environ.get("CAPT_DATASETS_FULL_REFRESH", "300"))
+FREEZE_DB = os.environ.get("CAPT_FREEZE_DB", ".runtime/capt_freezes.db").strip()
+FREEZE_RETENTION_DAYS = float(os.environ.get("CAPT_FREEZE_RETENTION_DAYS", "0"))
 
 
-def _validate_payload(payload: dict[str, Any]) -> dict[str, Any]:
+def _check_keys(payload: dict[str, Any]) -> None:
     if len(payload) > MAX_PAYLOAD_KEYS:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail="payload has too many keys",
         )
 
+
+def _validate_payload(payload: dict[str, Any]) -> dict[str, Any]:
+    _check_keys(payload)
+
     encoded = json.dumps(payload, separators=(",", ":")).encode("utf-8")
     if len(encoded) > MAX_PAYLOAD_BYTES:
         raise HTTPException(
@@ -33,6 +47,64 @@ def _validate_payload(payload: dict[str, Any]) -> dict[str, Any]:
     return payload
 
 
+class _BatchTruncated(Exception):
+    """O corpo passou de ``MAX_BATCH_BYTES``; ``next_line`` é a primeira linha não lida."""
+
+    def __init__(self, next_line: int) -> None:
+        super().__init__(next_line)
+        self.next_line = next_line
+
+
+async def _iter_ndjson(request: Request) -> AsyncIterator[tuple[int, bytes | None]]:
+    """Lê o corpo em streaming e devolve ``(linha, bytes)``; ``None`` = linha acima do limite.
+
+    Nenhuma linha é acumulada além de ``MAX_PAYLOAD_BYTES``. Ao atingir ``MAX_BATCH_BYTES``
+    a leitura para: as linhas completas até ali são entregues e ``_BatchTruncated`` é
+    levantada (a linha cortada no limite é descartada).
+    """
+    buf = bytearray()
+    oversized = False
+    line_no = 0
+    total = 0
+    async for chunk in request.stream():
+        truncated = total + len(chunk) > MAX_BATCH_BYTES
+        if truncated:
+            chunk = chunk[: MAX_BATCH_BYTES - total]
+        total += len(chunk)
+        start = 0
+        while True:
+            nl = chunk.find(b"\n", start)
+            piece = chunk[start:] if nl < 0 else chunk[start:nl]
+            if not oversized:
+                if len(buf) + len(piece) > MAX_PAYLOAD_BYTES:
+                    oversized = True
+                    buf.clear()
+                else:
+                    buf += piece
+            if nl < 0:
+                break
+            line_no += 1
+            yield line_no, None if oversized else bytes(buf)
+            buf.clear()
+            oversized = False
+            start = nl + 1
+        if truncated:
+            raise _BatchTruncated(line_no + 1)
+    if buf or oversized:
+        yield line_no + 1, None if oversized else bytes(buf)
+
+
+def _parse_line(line: bytes) -> dict[str, Any]:
+    try:
+        payload = json.loads(line)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"invalid json: {exc}")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="payload must be an object")
+    _check_keys(payload)
+    return payload
+
+
 def _require_token(x_capt_token: str | None = Header(default=None)) -> None:
     expected = os.environ.get("CAPT_API_TOKEN")
     if not expected:
@@ -43,18 +115,81 @@ def _require_token(x_capt_token: str | None = Header(default=None)) -> None:
 
 router = APIRouter(dependencies=[Depends(_require_token)])
 router = APIRouter()
-_governor = ChromeOSRuntimeGovernor()
-_freeze_store = CAPTBenchmarkFreezeStore()
+_governor = ChromeOSRuntimeGovernor(
+    max_buffer=METRICS_CAPACITY, datasets_full_refresh=DATASETS_FULL_REFRESH
+)
+
+
+def _make_freeze_store() -> CAPTBenchmarkFreezeStore | DurableBenchmarkFreezeStore:
+    # CAPT_FREEZE_DB vazio mantém o scaffold em memória
+    if not FREEZE_DB:
+        return CAPTBenchmarkFreezeStore()
+    os.makedirs(os.path.dirname(os.path.abspath(FREEZE_DB)), exist_ok=True)
+    # Retenção 0 mantém o log inteiro; acima disso a escritora compacta o prefixo antigo
+    retention = FREEZE_RETENTION_DAYS * 86400 if FREEZE_RETENTION_DAYS > 0 else None
+    return DurableBenchmarkFreezeStore(FREEZE_DB, retention=retention)
+
+
+_freeze_store = _make_freeze_store()
+
+
+async def _freeze_many(payloads: list[dict[str, Any]]) -> list[dict]:
+    # O store durável só devolve após o commit do lote: espera fora do event loop
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(None, _freeze_store.freeze_many, payloads)
+    except FreezeStoreUnavailable as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc))
+
+
+@router.on_event("startup")
+async def _start_metrics_sampler() -> None:
+    if SAMPLE_INTERVAL > 0:
+        _governor.start_sampler(SAMPLE_INTERVAL)
+    if isinstance(_freeze_store, DurableBenchmarkFreezeStore):
+        _freeze_store.start()
+
+
+@router.on_event("shutdown")
+async def _stop_metrics_sampler() -> None:
+    _governor.stop_sampler(timeout=1.0)
+    if isinstance(_freeze_store, DurableBenchmarkFreezeStore):
+        _freeze_store.close(timeout=5.0)
 
 
 @router.post("/capt/chromeos/capture")
-async def capture_chromeos_metrics() -> dict:
-    return await _governor.capture_metrics()
+async def capture_chromeos_metrics(force: bool = False) -> dict:
+    return await _governor.capture_metrics(force=force)
+
+
+@router.get("/capt/chromeos/metrics")
+async def chromeos_metrics_window(window: float = 300.0) -> dict:
+    if window <= 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="window must be positive")
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _governor.aggregate_metrics, window)
+
+
+MAX_PROBE_FILE_MB = int(os.environ.get("CAPT_MAX_PROBE_FILE_MB", "256"))
 
 
 @router.post("/capt/terabox/measure")
-async def measure_terabox_latency() -> dict:
-    return await _governor.measure_terabox_latency()
+async def measure_terabox_latency(
+    probe: bool = False,
+    file_mb: int = 16,
+    block_kb: int = 4,
+    random_ops: int = 256,
+    direct: bool = False,
+) -> dict:
+    if probe and not (0 < file_mb <= MAX_PROBE_FILE_MB and 0 < block_kb <= 4096 and 0 < random_ops <= 100_000):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid probe parameters")
+    return await _governor.measure_terabox_latency(
+        probe=probe,
+        file_size=file_mb * 1024 * 1024,
+        block_size=block_kb * 1024,
+        random_ops=random_ops,
+        direct=direct,
+    )
 
 
 @router.get("/capt/runtime/status")
@@ -63,11 +198,121 @@ async def runtime_status() -> dict:
     return {
         "runtime": _governor.status(),
         "latest_benchmark_freeze": latest_freeze,
+        "freeze_store": (
+            _freeze_store.status() if isinstance(_freeze_store, DurableBenchmarkFreezeStore) else None
+        ),
     }
 
 
 @router.post("/capt/benchmark/freeze")
 async def freeze_benchmark(payload: dict | None = None) -> dict:
     safe_payload = _validate_payload(payload or {})
-    return _freeze_store.freeze(safe_payload)
+    return (await _freeze_many([safe_payload]))[0]
     return _freeze_store.freeze(payload)
+
+
+@router.post("/capt/benchmark/freeze/batch")
+async def freeze_benchmark_batch(request: Request) -> dict:
+    """Congela um stream NDJSON (um payload por linha) e devolve o resultado por linha.
+
+    Um corpo acima de ``MAX_BATCH_BYTES`` não perde os recibos já emitidos: o
+    processamento para no limite e a resposta traz ``truncated`` e ``next_line``
+    (a partir de onde reenviar).
+    """
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit() and int(length) > MAX_BATCH_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="batch too large",
+        )
+
+    results: list[dict] = []
+    pending: list[tuple[int, dict]] = []
+
+    async def _store_pending() -> None:
+        try:
+            records = await _freeze_many([p for _, p in pending])
+        except HTTPException as exc:
+            results.extend({"line": line_no, "ok": False, "error": exc.detail} for line_no, _ in pending)
+            pending.clear()
+            return
+        for (line_no, _), record in zip(pending, records):
+            results.append(
+                {"line": line_no, "ok": True, "seq": record.get("seq"), "hash": record.get("hash")}
+            )
+        pending.clear()
+
+    next_line = None
+    try:
+        async for line_no, line in _iter_ndjson(request):
+            if line is None:
+                results.append({"line": line_no, "ok": False, "error": "payload too large"})
+                continue
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                pending.append((line_no, _parse_line(line)))
+            except HTTPException as exc:
+                results.append({"line": line_no, "ok": False, "error": exc.detail})
+                continue
+            if len(pending) >= BATCH_CHUNK:
+                await _store_pending()
+    except _BatchTruncated as exc:
+        next_line = exc.next_line
+    if pending:
+        await _store_pending()
+
+    results.sort(key=lambda r: r["line"])
+    accepted = sum(1 for r in results if r["ok"])
+    return {
+        "accepted": accepted,
+        "rejected": len(results) - accepted,
+        "truncated": next_line is not None,
+        "next_line": next_line,
+        "results": results,
+    }
+
+
+def _durable_store() -> DurableBenchmarkFreezeStore:
+    if not isinstance(_freeze_store, DurableBenchmarkFreezeStore):
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="freeze queries require CAPT_FREEZE_DB",
+        )
+    return _freeze_store
+
+
+@router.get("/capt/benchmark/freezes")
+async def query_freezes(
+    since: float | None = None,
+    until: float | None = None,
+    key: str | None = None,
+    value: str | None = None,
+    limit: int = 100,
+) -> list[dict]:
+    store = _durable_store()
+    limit = max(1, min(limit, 1000))
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, lambda: store.query(since=since, until=until, key=key, value=value, limit=limit)
+    )
+
+
+@router.get("/capt/benchmark/freezes/verify")
+async def verify_freezes() -> dict:
+    store = _durable_store()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, store.verify_chain)
+
+
+@router.post("/capt/benchmark/freezes/compact", dependencies=[Depends(_require_token)])
+async def compact_freezes(older_than_days: float) -> dict:
+    """Remove congelamentos mais antigos que ``older_than_days`` (a cadeia segue ancorada)."""
+    if older_than_days < 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="older_than_days must be >= 0")
+    store = _durable_store()
+    before_ts = time.time() - older_than_days * 86400
+    loop = asyncio.get_running_loop()
+    removed = await loop.run_in_executor(None, store.compact, before_ts)
+    return {"removed": removed, "before_ts": before_ts}
@@ -0,0 +1,134 @@
+"""On-disk, content-addressed cache for matverse-core benchmark artifacts.
+
+Entries are small JSON documents keyed by an opaque string (GitHub blob/tree SHA,
+contents URL, ...). Each entry lives in its own file named after ``sha256(key)``
+so writes are atomic (``os.replace``) and concurrent readers never observe a
+partial document. The cache is bounded by total size on disk: when it grows past
+``max_bytes`` the least recently used entries (by mtime, refreshed on read) are
+evicted.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+
+class ArtifactCache:
+    def __init__(self, root: str, max_bytes: int = 64 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+        self._total_bytes: Optional[int] = None
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, f"{digest}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if entry.get("key") != key:
+            return None
+        try:
+            # Marca uso recente para a política LRU
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry.get("value")
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        path = self._path(key)
+        blob = json.dumps({"key": key, "value": value}, separators=(",", ":")).encode("utf-8")
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+        self._total_bytes = self.total_bytes() - previous + len(blob)
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def total_bytes(self) -> int:
+        if self._total_bytes is None:
+            total = 0
+            for _, size in self._entries():
+                total += size
+            self._total_bytes = total
+        return self._total_bytes
+
+    def _entries(self):
+        with os.scandir(self.root) as it:
+            for e in it:
+                if not e.name.endswith(".json"):
+                    continue
+                try:
+                    st = e.stat()
+                except FileNotFoundError:
+                    continue
+                yield e, st.st_size
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits ``max_bytes``."""
+        entries = []
+        total = 0
+        for e, size in self._entries():
+            try:
+                mtime = e.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            entries.append((mtime, e.path, size))
+            total += size
+
+        removed = 0
+        # Libera até ~90% do limite para não reavaliar a cada put
+        target = int(self.max_bytes * 0.9)
+        for _, path, size in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+
+        self._total_bytes = total
+        return removed
+
+
+@lru_cache(maxsize=1)
+def default_cache() -> Optional[ArtifactCache]:
+    """Cache configured via ``CORE_CACHE_DIR`` / ``CORE_CACHE_MAX_MB`` (empty dir disables).
+
+    Built once per process: every refresh shares the same instance, so its running
+    ``total_bytes`` stays warm instead of rescanning the cache dir on the first put.
+    """
+    root = os.getenv("CORE_CACHE_DIR", ".runtime/core_cache").strip()
+    if not root:
+        return None
+    max_mb = float(os.getenv("CORE_CACHE_MAX_MB", "64"))
+    try:
+        return ArtifactCache(root, max_bytes=int(max_mb * 1024 * 1024))
+    except OSError:
+        # Diretório não gravável (ex.: FS read-only): segue sem cache
+        return None
+
@@ -0,0 +1,106 @@
+"""Shards incrementais de snapshot (scripts/snapshot_sqlite.py --shards) no scan.
+
+Cada shard é um SQLite imutável com as linhas de pose/pole de uma faixa de
+blocos; ``shards.json`` lista os shards encadeados por hash. Aqui a cadeia é
+conferida uma vez e cada conexão do engine anexa os shards (somente leitura,
+``immutable=1``) e cria views TEMP ``pose``/``pole`` com UNION ALL sobre eles,
+então as consultas do app não mudam. Blocos são por chain, então há uma cadeia
+de shards por chain_id; ``MATVERSE_SHARDS`` aceita vários ``shards.json``
+separados por ``os.pathsep``. Só os shards vivos (o último rollup e os posteriores)
+são anexados: os arquivos cobertos por um rollup podem já ter sido apagados.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+
+from scripts.shard_manifest import SHARD_TABLES, check_shard_chain, live_shards
+
+
+def _sha256_file(path: Path, bufsize: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(bufsize), b""):
+            h.update(chunk)
+    return "0x" + h.hexdigest()
+
+
+@dataclass(frozen=True)
+class ShardSet:
+    chains: tuple[dict, ...]
+    files: tuple[Path, ...]
+
+    @staticmethod
+    def _load_chain(manifest_path: str | Path, verify_files: bool) -> tuple[dict, list[Path]]:
+        path = Path(manifest_path).resolve()
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+        try:
+            check_shard_chain(manifest)
+        except ValueError as exc:
+            raise ValueError(f"{path}: {exc}") from None
+        files: list[Path] = []
+        blocks: list[list[int]] = []
+        for entry in live_shards(manifest["shards"]):
+            shard = path.parent / entry["sqlite"]
+            if not shard.exists():
+                raise FileNotFoundError(f"shard not found (download/decompress {entry['sqlite_zst']}): {shard}")
+            if verify_files and _sha256_file(shard) != entry["sqlite_sha256"]:
+                raise ValueError(f"{shard}: sha256 mismatch")
+            files.append(shard)
+            blocks.append([entry["blocks"]["from"], entry["blocks"]["to"]])
+        info = {
+            "manifest": str(path),
+            "chain_id": int(manifest["chain_id"]),
+            "head": manifest["head"],
+            "entries": len(manifest["shards"]),
+            "blocks": blocks,
+        }
+        return info, files
+
+    @classmethod
+    def load(cls, manifest_paths: list[str | Path], verify_files: bool = False) -> "ShardSet":
+        """Lê cada ``shards.json``, confere a cadeia ``prev -> entry_hash`` e a existência dos arquivos.
+
+        ``verify_files=True`` também recalcula o SHA-256 de cada shard (lento em shards grandes).
+        """
+        chains: list[dict] = []
+        files: list[Path] = []
+        for manifest_path in manifest_paths:
+            info, chain_files = cls._load_chain(manifest_path, verify_files)
+            if any(c["chain_id"] == info["chain_id"] for c in chains):
+                raise ValueError(f"two shard manifests for chain_id {info['chain_id']}")
+            chains.append(info)
+            files.extend(chain_files)
+        return cls(tuple(chains), tuple(files))
+
+    def attach(self, conn: sqlite3.Connection) -> None:
+        """Anexa os shards a uma conexão DB-API e cria as views TEMP ``pose``/``pole``."""
+        if not self.files:
+            return
+        limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        if len(self.files) > limit:
+            raise RuntimeError(
+                f"{len(self.files)} live shards exceed SQLite's attach limit ({limit}); "
+                "fold them with scripts/snapshot_sqlite.py --shards --rollup (make snapshot-rollup) "
+                "or lower --max-shards"
+            )
+        for i, shard in enumerate(self.files):
+            conn.execute(f"ATTACH DATABASE ? AS shard_{i}", (shard.as_uri() + "?mode=ro&immutable=1",))
+        for table in SHARD_TABLES:
+            union = " UNION ALL ".join(f"SELECT * FROM shard_{i}.{table}" for i in range(len(self.files)))
+            conn.execute(f"CREATE TEMP VIEW IF NOT EXISTS {table} AS {union}")
+
+    def status(self) -> dict:
+        return {"shards": len(self.files), "chains": list(self.chains)}
+
+
+def default_shard_set() -> ShardSet | None:
+    paths = [p for p in os.environ.get("MATVERSE_SHARDS", "").split(os.pathsep) if p]
+    if not paths:
+        return None
+    return ShardSet.load(paths, verify_files=os.environ.get("MATVERSE_SHARDS_VERIFY", "0") == "1")
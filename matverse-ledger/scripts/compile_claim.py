@@ -7,22 +7,43 @@ Steps performed:
 - Hash the referenced artifact (e.g., bench/run_bench.py) and inject the digest.
 - Emit the canonical claim hash (sha256 of the sorted JSON representation).
 - Optionally write the updated claim and claim hash to disk.
+
+Batch mode (--claims-dir) compiles every *.yaml/*.yml in a directory across a
+process pool, building the schema validator once per worker. Artifact digests are
+computed in streaming chunks and cached in --hash-cache, keyed by
+(path, size, mtime_ns, inode), so unchanged artifacts are never re-hashed.
+
+Artifacts with kind "merkle-file" or "merkle-dir" are hashed as chunked Merkle
+trees (see scripts/merkle_artifact.py): the claim records "merkle-sha256:<root>"
+plus artifact.chunk_size, and --merkle-manifest-out writes the per-chunk leaves
+so a verifier can pinpoint which chunk of which file differs.
 """
 import argparse
 import hashlib
 import json
+import os
 import pathlib
+from concurrent.futures import ProcessPoolExecutor
 
 import yaml
-from jsonschema import validate
+from jsonschema.validators import validator_for
 
+import merkle_artifact
+from canonical_json import canonical_sha256
 
-def sha256_hex(data: bytes) -> str:
-    return hashlib.sha256(data).hexdigest()
+HASH_BUFSIZE = 1024 * 1024
+MERKLE_KINDS = ("merkle-file", "merkle-dir")
 
 
-def canonical_bytes(payload: dict) -> bytes:
-    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+def sha256_file(path: pathlib.Path, bufsize: int = HASH_BUFSIZE) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        while True:
+            chunk = f.read(bufsize)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
 
 
 def resolve_artifact_path(uri: str, claim_path: pathlib.Path, artifact_root: pathlib.Path | None) -> pathlib.Path:
@@ -33,14 +54,84 @@ def resolve_artifact_path(uri: str, claim_path: pathlib.Path, artifact_root: pat
     return path
 
 
-def hash_artifact(claim: dict, claim_path: pathlib.Path, artifact_root: pathlib.Path | None) -> str:
+class ArtifactHashCache:
+    """Digest cache keyed by resolved path; an entry is valid while (size, mtime_ns, inode) match."""
+
+    def __init__(self, entries: dict | None = None):
+        self.entries = entries or {}
+        self.updates: dict = {}
+
+    @classmethod
+    def load(cls, path: pathlib.Path | None) -> "ArtifactHashCache":
+        if path is None or not path.exists():
+            return cls()
+        try:
+            return cls(load_json(path))
+        except ValueError:
+            return cls()
+
+    def save(self, path: pathlib.Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self.entries, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def lookup(self, key: str, stamp_path: pathlib.Path, compute) -> str:
+        st = stamp_path.stat()
+        stamp = [st.st_size, st.st_mtime_ns, st.st_ino]
+        cached = self.entries.get(key)
+        if cached and cached.get("stamp") == stamp:
+            return cached["digest"]
+        digest = compute()
+        entry = {"stamp": stamp, "digest": digest}
+        self.entries[key] = entry
+        self.updates[key] = entry
+        return digest
+
+    def digest(self, artifact_path: pathlib.Path) -> str:
+        return self.lookup(str(artifact_path), artifact_path, lambda: f"sha256:{sha256_file(artifact_path)}")
+
+    def merkle_file_root(self, path: pathlib.Path, chunk_size: int) -> str:
+        # Raiz por arquivo: num merkle-dir só os arquivos alterados são re-hasheados
+        return self.lookup(f"merkle:{chunk_size}:{path}", path, lambda: merkle_artifact.file_root(path, chunk_size))
+
+
+def merkle_digest(
+    artifact_path: pathlib.Path, kind: str, chunk_size: int, cache: ArtifactHashCache | None = None
+) -> str:
+    file_root = (lambda p: cache.merkle_file_root(p, chunk_size)) if cache is not None else (
+        lambda p: merkle_artifact.file_root(p, chunk_size)
+    )
+    if kind == "merkle-file":
+        if not artifact_path.is_file():
+            raise ValueError(f"merkle-file artifact is not a file: {artifact_path}")
+        root = file_root(artifact_path)
+    else:
+        if not artifact_path.is_dir():
+            raise ValueError(f"merkle-dir artifact is not a directory: {artifact_path}")
+        root = merkle_artifact.dir_root(artifact_path, chunk_size, file_root)
+    return merkle_artifact.HASH_PREFIX + root
+
+
+def hash_artifact(
+    claim: dict,
+    claim_path: pathlib.Path,
+    artifact_root: pathlib.Path | None,
+    cache: ArtifactHashCache | None = None,
+) -> str:
     artifact = claim.get("artifact", {})
     uri = artifact.get("uri")
     if not uri:
         raise ValueError("artifact.uri is required in the claim")
     artifact_path = resolve_artifact_path(uri, claim_path, artifact_root)
-    data = artifact_path.read_bytes()
-    return f"sha256:{sha256_hex(data)}"
+    kind = artifact.get("kind")
+    if kind in MERKLE_KINDS:
+        chunk_size = int(artifact.get("chunk_size") or merkle_artifact.DEFAULT_CHUNK_SIZE)
+        artifact["chunk_size"] = chunk_size
+        return merkle_digest(artifact_path, kind, chunk_size, cache)
+    if cache is not None:
+        return cache.digest(artifact_path)
+    return f"sha256:{sha256_file(artifact_path)}"
 
 
 def load_json(path: pathlib.Path) -> dict:
@@ -55,30 +146,147 @@ def write_yaml(content: dict, path: pathlib.Path) -> None:
     path.write_text(yaml.safe_dump(content, sort_keys=False), encoding="utf-8")
 
 
+def compile_claim(
+    claim_path: pathlib.Path,
+    validator,
+    artifact_root: pathlib.Path | None,
+    out_path: pathlib.Path,
+    cache: ArtifactHashCache | None = None,
+) -> dict:
+    claim = load_yaml(claim_path)
+    validator.validate(claim)
+
+    artifact_hash = hash_artifact(claim, claim_path, artifact_root, cache)
+    claim["artifact"]["hash"] = artifact_hash
+
+    claim_hash = "0x" + canonical_sha256(claim)
+    write_yaml(claim, out_path)
+    return {"claim": str(claim_path), "artifact_hash": artifact_hash, "claim_hash": claim_hash, "written": str(out_path)}
+
+
+def write_merkle_manifest(claim_path: pathlib.Path, artifact_root: pathlib.Path | None, out: pathlib.Path) -> None:
+    artifact = load_yaml(claim_path)["artifact"]
+    if artifact.get("kind") not in MERKLE_KINDS:
+        raise SystemExit(f"--merkle-manifest-out requires artifact.kind in {MERKLE_KINDS}")
+    artifact_path = resolve_artifact_path(artifact["uri"], claim_path, artifact_root)
+    chunk_size = int(artifact.get("chunk_size") or merkle_artifact.DEFAULT_CHUNK_SIZE)
+    manifest = merkle_artifact.manifest(artifact_path, chunk_size)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    print(f"merkle_manifest_written={out.resolve()}")
+
+
+def build_validator(schema: dict):
+    cls = validator_for(schema)
+    cls.check_schema(schema)
+    return cls(schema)
+
+
+# Estado por worker do pool: validator e cache montados uma vez no initializer
+_WORKER: dict = {}
+
+
+def _init_worker(schema: dict, cache_entries: dict, artifact_root: pathlib.Path | None) -> None:
+    _WORKER["validator"] = build_validator(schema)
+    _WORKER["cache_entries"] = cache_entries
+    _WORKER["artifact_root"] = artifact_root
+
+
+def _compile_in_worker(paths: tuple[pathlib.Path, pathlib.Path]) -> dict:
+    claim_path, out_path = paths
+    cache = ArtifactHashCache(dict(_WORKER["cache_entries"]))
+    try:
+        result = compile_claim(claim_path, _WORKER["validator"], _WORKER["artifact_root"], out_path, cache)
+    except Exception as exc:
+        return {"claim": str(claim_path), "error": f"{type(exc).__name__}: {exc}", "cache_updates": {}}
+    result["cache_updates"] = cache.updates
+    return result
+
+
+def compile_batch(
+    claims_dir: pathlib.Path,
+    schema: dict,
+    artifact_root: pathlib.Path | None,
+    out_dir: pathlib.Path | None,
+    cache: ArtifactHashCache,
+    workers: int,
+) -> list[dict]:
+    claim_paths = sorted(p for p in claims_dir.iterdir() if p.suffix in (".yaml", ".yml") and p.is_file())
+    tasks = [(p.resolve(), (out_dir / p.name).resolve() if out_dir else p.resolve()) for p in claim_paths]
+    if out_dir:
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+    if workers <= 1 or len(tasks) <= 1:
+        _init_worker(schema, cache.entries, artifact_root)
+        results = [_compile_in_worker(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(tasks)),
+            initializer=_init_worker,
+            initargs=(schema, cache.entries, artifact_root),
+        ) as pool:
+            chunksize = max(1, len(tasks) // (workers * 4))
+            results = list(pool.map(_compile_in_worker, tasks, chunksize=chunksize))
+
+    for r in results:
+        cache.entries.update(r.pop("cache_updates"))
+    return results
+
+
 def main():
     ap = argparse.ArgumentParser(description="Compile a claim into a canonical hashable form")
     ap.add_argument("--claim", default="spec/claim.example.yaml", help="Path to the claim YAML file")
+    ap.add_argument("--claims-dir", default=None, help="Compile every claim YAML in this directory (batch mode)")
     ap.add_argument("--schema", default="spec/claim.schema.json", help="Path to the claim JSON schema")
     ap.add_argument("--artifact-root", default=None, help="Base directory to resolve relative artifact URIs")
     ap.add_argument("--out", default=None, help="Where to write the updated claim YAML (defaults to overwriting the input)")
+    ap.add_argument("--out-dir", default=None, help="Batch mode: directory for compiled claims (defaults to in place)")
     ap.add_argument("--hash-out", default=None, help="Optional file to write the computed claim hash")
+    ap.add_argument("--index-out", default=None, help="Batch mode: optional JSON index {claim file: claim hash}")
+    ap.add_argument("--hash-cache", default=".runtime/artifact_hash_cache.json", help="Artifact digest cache file ('' disables)")
+    ap.add_argument(
+        "--merkle-manifest-out",
+        default=None,
+        help="Single-claim mode: write per-chunk Merkle leaves for merkle-file/merkle-dir artifacts",
+    )
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Batch mode: worker processes")
     args = ap.parse_args()
 
-    claim_path = pathlib.Path(args.claim).resolve()
     schema_path = pathlib.Path(args.schema).resolve()
     artifact_root = pathlib.Path(args.artifact_root).resolve() if args.artifact_root else None
-
-    claim = load_yaml(claim_path)
+    cache_path = pathlib.Path(args.hash_cache) if args.hash_cache else None
+    cache = ArtifactHashCache.load(cache_path)
     schema = load_json(schema_path)
-    validate(instance=claim, schema=schema)
 
-    artifact_hash = hash_artifact(claim, claim_path, artifact_root)
-    claim["artifact"]["hash"] = artifact_hash
+    if args.claims_dir:
+        out_dir = pathlib.Path(args.out_dir) if args.out_dir else None
+        results = compile_batch(pathlib.Path(args.claims_dir), schema, artifact_root, out_dir, cache, args.workers)
+        if cache_path is not None:
+            cache.save(cache_path)
 
-    claim_hash = "0x" + sha256_hex(canonical_bytes(claim))
+        failed = [r for r in results if "error" in r]
+        for r in results:
+            if "error" in r:
+                print(f"error claim={r['claim']} {r['error']}")
+            else:
+                print(f"claim_hash={r['claim_hash']} artifact_hash={r['artifact_hash']} written={r['written']}")
+        if args.index_out:
+            index_path = pathlib.Path(args.index_out)
+            index_path.parent.mkdir(parents=True, exist_ok=True)
+            index = {pathlib.Path(r["claim"]).name: r["claim_hash"] for r in results if "error" not in r}
+            index_path.write_text(json.dumps(index, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"compiled={len(results) - len(failed)} failed={len(failed)}")
+        raise SystemExit(1 if failed else 0)
 
+    claim_path = pathlib.Path(args.claim).resolve()
     out_path = pathlib.Path(args.out).resolve() if args.out else claim_path
-    write_yaml(claim, out_path)
+    result = compile_claim(claim_path, build_validator(schema), artifact_root, out_path, cache)
+    if cache_path is not None and cache.updates:
+        cache.save(cache_path)
+    artifact_hash, claim_hash = result["artifact_hash"], result["claim_hash"]
+
+    if args.merkle_manifest_out:
+        write_merkle_manifest(claim_path, artifact_root, pathlib.Path(args.merkle_manifest_out))
 
     if args.hash_out:
         hash_out_path = pathlib.Path(args.hash_out)
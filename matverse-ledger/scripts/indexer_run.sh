@@ -3,6 +3,15 @@ set -euo pipefail
 source .runtime/addresses.env
 source .venv/bin/activate
 
+# Multi-chain: INDEXER_CONFIG=indexer/chains.example.yaml [INDEXER_FOLLOW=1] bash scripts/indexer_run.sh
+if [[ -n "${INDEXER_CONFIG:-}" ]]; then
+  export POSE_ADDR POLE_ADDR RPC
+  python3 indexer/indexer.py \
+    --config "$INDEXER_CONFIG" \
+    ${INDEXER_FOLLOW:+--follow}
+  exit 0
+fi
+
 python3 indexer/indexer.py \
   --rpc "$RPC" \
   --pose "$POSE_ADDR" \
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Chunked Merkle hashing for large and multi-file claim artifacts.
+
+Layout (domain-separated SHA-256, odd nodes are promoted unchanged):
+- chunk leaf:  H(0x00 || chunk)           -- fixed-size chunks of one file
+- inner node:  H(0x01 || left || right)
+- dir entry:   H(0x02 || relpath || 0x00 || file_root)   -- sorted POSIX relpaths
+
+A file's root is the Merkle root of its chunk leaves; a directory's root is the
+Merkle root of its sorted entry leaves. Chunks are hashed in parallel threads
+straight from a memory-mapped file (hashlib releases the GIL on large buffers),
+so multi-GB artifacts use all cores without being loaded into memory.
+
+Run standalone to write or check a manifest of per-chunk leaves:
+    python scripts/merkle_artifact.py PATH --manifest-out m.json
+    python scripts/merkle_artifact.py PATH --check m.json
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import pathlib
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+HASH_PREFIX = "merkle-sha256:"
+
+
+def merkle_root(leaves: list[bytes]) -> bytes:
+    if not leaves:
+        return hashlib.sha256(b"\x00").digest()
+    level = leaves
+    while len(level) > 1:
+        nxt = [
+            hashlib.sha256(b"\x01" + level[i] + level[i + 1]).digest()
+            for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2:
+            nxt.append(level[-1])
+        level = nxt
+    return level[0]
+
+
+def _hash_chunk(view: memoryview) -> bytes:
+    h = hashlib.sha256(b"\x00")
+    h.update(view)
+    return h.digest()
+
+
+def file_leaves(path: pathlib.Path, chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int | None = None) -> list[bytes]:
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    size = path.stat().st_size
+    if size == 0:
+        return [_hash_chunk(memoryview(b""))]
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            offsets = range(0, size, chunk_size)
+            if len(offsets) == 1:
+                return [_hash_chunk(view)]
+            with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+                return list(pool.map(lambda off: _hash_chunk(view[off : off + chunk_size]), offsets))
+        finally:
+            view.release()
+
+
+def file_root(path: pathlib.Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    return merkle_root(file_leaves(path, chunk_size)).hex()
+
+
+def dir_files(path: pathlib.Path) -> list[pathlib.Path]:
+    return sorted((p for p in path.rglob("*") if p.is_file()), key=lambda p: p.relative_to(path).as_posix())
+
+
+def entry_leaf(relpath: str, root_hex: str) -> bytes:
+    return hashlib.sha256(b"\x02" + relpath.encode("utf-8") + b"\x00" + bytes.fromhex(root_hex)).digest()
+
+
+def dir_root(path: pathlib.Path, chunk_size: int = DEFAULT_CHUNK_SIZE, file_root_fn=None) -> str:
+    """Root of a directory; ``file_root_fn(path)`` lets callers plug in a digest cache."""
+    file_root_fn = file_root_fn or (lambda p: file_root(p, chunk_size))
+    leaves = [entry_leaf(p.relative_to(path).as_posix(), file_root_fn(p)) for p in dir_files(path)]
+    return merkle_root(leaves).hex()
+
+
+def manifest(path: pathlib.Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    files = [path] if path.is_file() else dir_files(path)
+    entries = {}
+    for p in files:
+        leaves = file_leaves(p, chunk_size)
+        rel = p.name if path.is_file() else p.relative_to(path).as_posix()
+        entries[rel] = {"root": merkle_root(leaves).hex(), "leaves": [x.hex() for x in leaves]}
+    if path.is_file():
+        root = next(iter(entries.values()))["root"]
+    else:
+        root = merkle_root([entry_leaf(rel, e["root"]) for rel, e in entries.items()]).hex()
+    return {"kind": "merkle-file" if path.is_file() else "merkle-dir", "chunk_size": chunk_size, "root": root, "files": entries}
+
+
+def diff_manifests(expected: dict, actual: dict) -> list[dict]:
+    """Files and chunk indexes whose leaves differ between two manifests."""
+    diffs = []
+    for rel in sorted(expected["files"].keys() | actual["files"].keys()):
+        a = expected["files"].get(rel)
+        b = actual["files"].get(rel)
+        if a is None or b is None:
+            diffs.append({"file": rel, "missing": "actual" if b is None else "expected"})
+            continue
+        if a["root"] == b["root"]:
+            continue
+        n = max(len(a["leaves"]), len(b["leaves"]))
+        chunks = [
+            i for i in range(n)
+            if i >= len(a["leaves"]) or i >= len(b["leaves"]) or a["leaves"][i] != b["leaves"][i]
+        ]
+        diffs.append({"file": rel, "chunks": chunks})
+    return diffs
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Merkle-hash an artifact file or directory")
+    ap.add_argument("path", help="Artifact file or directory")
+    ap.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Chunk size in bytes")
+    ap.add_argument("--manifest-out", default=None, help="Write per-chunk leaves to this JSON file")
+    ap.add_argument("--check", default=None, help="Compare against a previously written manifest")
+    args = ap.parse_args()
+
+    path = pathlib.Path(args.path).resolve()
+    if args.check:
+        expected = json.loads(pathlib.Path(args.check).read_text(encoding="utf-8"))
+        actual = manifest(path, int(expected["chunk_size"]))
+        diffs = diff_manifests(expected, actual)
+        for d in diffs:
+            print(json.dumps(d, sort_keys=True))
+        print(f"root={HASH_PREFIX}{actual['root']} match={actual['root'] == expected['root']}")
+        return 0 if not diffs and actual["root"] == expected["root"] else 1
+
+    m = manifest(path, args.chunk_size)
+    if args.manifest_out:
+        out = pathlib.Path(args.manifest_out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(m, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    print(f"root={HASH_PREFIX}{m['root']} chunk_size={m['chunk_size']} files={len(m['files'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+shards.json helpers shared by scripts/snapshot_sqlite.py (writer) and scan/shard_db.py (reader).
+
+Stdlib only, so scan can import it as ``scripts.shard_manifest``. Every entry carries
+``prev`` (the previous ``entry_hash``) and its own ``entry_hash``. A rollup entry
+(``"rollup": {"from_seq", "to_seq"}``) holds all rows of the entries it folds, so
+readers only attach the latest rollup and the shards appended after it.
+"""
+import hashlib
+import json
+from typing import Any, Dict, List
+
+# Tabelas fatiadas por faixa de blocos nos shards incrementais
+SHARD_TABLES = ("pose", "pole")
+SHARD_MANIFEST = "shards.json"
+
+
+def shard_entry_hash(entry: Dict[str, Any]) -> str:
+    body = {k: v for k, v in entry.items() if k != "entry_hash"}
+    return "0x" + hashlib.sha256(json.dumps(body, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def check_shard_chain(manifest: Dict[str, Any]) -> None:
+    """Raise ``ValueError`` unless every entry links to the previous one and ``head`` is the last."""
+    prev = None
+    for entry in manifest["shards"]:
+        if entry["prev"] != prev or shard_entry_hash(entry) != entry["entry_hash"]:
+            raise ValueError(f"broken shard chain at seq {entry['seq']}")
+        prev = entry["entry_hash"]
+    if manifest.get("head") != prev:
+        raise ValueError("head does not match the last shard")
+
+
+def live_shards(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Entries whose files must be attached: the latest rollup and everything after it."""
+    for i in range(len(entries) - 1, -1, -1):
+        if entries[i].get("rollup"):
+            return entries[i:]
+    return list(entries)
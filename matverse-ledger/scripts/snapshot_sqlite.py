@@ -1,25 +1,70 @@
 #!/usr/bin/env python3
-"""Generate a compact, checksummed SQLite snapshot for MatVerseScan."""
+"""Generate a compact, checksummed SQLite snapshot for MatVerseScan.
+
+The source DB is only read (online backup API or VACUUM INTO from a read
+transaction); compaction and integrity checks run on the copy, so the indexer
+keeps writing while the snapshot is produced. The copy is then read exactly once:
+each chunk feeds the raw SHA-256 and a multi-threaded zstd compressor whose output
+is hashed as it is written.
+
+With --shards, each run instead appends one immutable shard holding the pose/pole
+rows of the blocks after the previous shard, and records it in shards.json, where
+every entry carries the hash of the previous one. Mirrors only fetch the newest
+shard; MatVerseScan attaches them all (MATVERSE_SHARDS) behind pose/pole views.
+Shards only hold rows of --chain-id: use one output dir per chain. SQLite attaches
+at most 10 DBs per connection, so once a chain has more than --max-shards live shards
+(or with --rollup) they are folded into one base shard, appended to the same chain.
+"""
 import argparse
 import hashlib
 import json
 import os
+import queue
 import shutil
 import sqlite3
+import subprocess
 import sys
+import threading
 import time
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Tuple
 
-def sha256_file(path: Path, bufsize: int = 1024 * 1024) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        while True:
-            chunk = f.read(bufsize)
-            if not chunk:
-                break
-            h.update(chunk)
-    return "0x" + h.hexdigest()
+from shard_manifest import SHARD_MANIFEST, SHARD_TABLES, check_shard_chain, live_shards, shard_entry_hash
+
+SNAPSHOT_SCHEMA: Dict[str, Any] = {
+    "pose": [
+        "id",
+        "claim_hash",
+        "submitter",
+        "metadata_uri",
+        "proof_hash",
+        "block_number",
+        "tx_hash",
+        "timestamp",
+        "chain_id",
+        "contract",
+    ],
+    "pole": [
+        "claim_hash",
+        "run_hash",
+        "submitter",
+        "verdict",
+        "omega_u6",
+        "psi_u6",
+        "cvar_u6",
+        "latency_ms",
+        "block_number",
+        "tx_hash",
+        "timestamp",
+        "chain_id",
+        "contract",
+    ],
+    "pole_pk": ["claim_hash", "run_hash", "chain_id", "contract"],
+    "fts": {"pose_fts": {"content": "pose", "columns": ["metadata_uri"]}},
+}
+
+# Índices FTS5 external-content sobre SHARD_TABLES: recriados e reconstruídos em cada shard
+SHARD_FTS = ("pose_fts",)
 
 def row_counts(conn: sqlite3.Connection) -> Dict[str, int]:
     cur = conn.cursor()
@@ -33,6 +78,12 @@ def row_counts(conn: sqlite3.Connection) -> Dict[str, int]:
 
 def integrity_checks(conn: sqlite3.Connection) -> None:
     cur = conn.cursor()
+    for (fts,) in cur.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND sql LIKE 'CREATE VIRTUAL TABLE%USING fts5%'"
+    ).fetchall():
+        # Confere o índice FTS5 contra a tabela de conteúdo
+        cur.execute(f"INSERT INTO {fts}({fts}, rank) VALUES ('integrity-check', 1)")
+
     cur.execute("PRAGMA quick_check;")
     quick = cur.fetchone()[0]
     if quick != "ok":
@@ -43,52 +94,507 @@ def integrity_checks(conn: sqlite3.Connection) -> None:
     if integrity != "ok":
         raise RuntimeError(f"PRAGMA integrity_check failed: {integrity}")
 
-def optimize_and_vacuum(src: Path) -> None:
-    # Optimize using WAL for safety, then VACUUM with DELETE mode for a compact file.
-    conn = sqlite3.connect(src.as_posix())
+def _open_source(src: Path) -> sqlite3.Connection:
+    # Somente leitura e autocommit: a transação de leitura é aberta explicitamente
+    return sqlite3.connect(f"file:{src.as_posix()}?mode=ro", uri=True, isolation_level=None, timeout=30)
+
+class _BackupRestarted(Exception):
+    pass
+
+def _stepped_backup(src_conn: sqlite3.Connection, dst_conn: sqlite3.Connection, pages: int, sleep: float, max_restarts: int) -> int:
+    """Backup em passos que soltam o lock; aborta se o SQLite reiniciar a cópia ``max_restarts`` vezes."""
+    state = {"remaining": None, "restarts": 0}
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > max_restarts:
+                raise _BackupRestarted()
+        state["remaining"] = remaining
+
+    src_conn.backup(dst_conn, pages=pages, progress=progress, sleep=sleep)
+    return state["restarts"]
+
+def online_snapshot(
+    src: Path,
+    dst: Path,
+    method: str = "backup",
+    pages: int = 4096,
+    sleep: float = 0.005,
+    max_restarts: int = 3,
+) -> Dict[str, Any]:
+    """Consistent copy of a live DB without writing to it.
+
+    In WAL mode a read transaction pins one snapshot for the whole copy while the
+    indexer keeps committing. In rollback-journal mode holding that lock would block
+    writers, so the backup runs in ``pages``-sized steps that release it in between;
+    if concurrent commits restart the copy more than ``max_restarts`` times, it falls
+    back to a single step (writers wait only for the raw page copy, not a VACUUM).
+    ``method="vacuum-into"`` copies and compacts in a single read transaction instead.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(dst.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    t0 = time.perf_counter()
+    restarts = 0
+    src_conn = _open_source(src)
     try:
-        conn.execute("PRAGMA journal_mode=WAL;")
-        conn.execute("PRAGMA synchronous=FULL;")
-        conn.execute("PRAGMA optimize;")
-        integrity_checks(conn)
+        journal_mode = src_conn.execute("PRAGMA journal_mode;").fetchone()[0].lower()
+        pinned = journal_mode == "wal" or method == "vacuum-into"
+        if method == "vacuum-into":
+            src_conn.execute("VACUUM INTO ?", (tmp.as_posix(),))
+        elif method == "backup":
+            dst_conn = sqlite3.connect(tmp.as_posix())
+            try:
+                if pinned:
+                    src_conn.execute("BEGIN")
+                    src_conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                    src_conn.backup(dst_conn, pages=pages, sleep=0)
+                    src_conn.execute("COMMIT")
+                else:
+                    try:
+                        restarts = _stepped_backup(src_conn, dst_conn, pages, sleep, max_restarts)
+                    except _BackupRestarted:
+                        restarts = max_restarts + 1
+                        pinned = True
+                        src_conn.backup(dst_conn, pages=-1)
+            finally:
+                dst_conn.close()
+        else:
+            raise ValueError(f"unknown snapshot method: {method}")
     finally:
-        conn.close()
+        src_conn.close()
+    copy_s = time.perf_counter() - t0
 
-    conn = sqlite3.connect(src.as_posix())
+    compact_snapshot(tmp, vacuum=method == "backup")
+    os.replace(tmp, dst)
+    return {
+        "method": method,
+        "source_journal_mode": journal_mode,
+        "pinned_read_txn": pinned,
+        "backup_restarts": restarts,
+        "copy_seconds": round(copy_s, 3),
+        "total_seconds": round(time.perf_counter() - t0, 3),
+    }
+
+def compact_snapshot(path: Path, vacuum: bool = True) -> None:
+    # Só a cópia é reescrita: journal DELETE (arquivo único) + VACUUM para ficar compacta
+    conn = sqlite3.connect(path.as_posix())
     try:
         conn.execute("PRAGMA journal_mode=DELETE;")
-        conn.execute("VACUUM;")
+        if vacuum:
+            conn.execute("VACUUM;")
+        conn.execute("PRAGMA optimize;")
     finally:
         conn.close()
 
-def copy_db(src: Path, dst: Path) -> None:
-    dst.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copy2(src, dst)
+class _HashingWriter:
+    """File-like sink that hashes compressed bytes on their way to disk."""
+
+    def __init__(self, fout) -> None:
+        self.fout = fout
+        self.sha = hashlib.sha256()
+        self.bytes = 0
 
-def maybe_zstd(src: Path, dst: Path) -> Tuple[bool, str]:
-    """Attempt to compress with zstandard (Python or CLI)."""
+    def write(self, data) -> int:
+        self.sha.update(data)
+        self.bytes += len(data)
+        return self.fout.write(data)
+
+    def flush(self) -> None:
+        self.fout.flush()
+
+def _zstd_sink(dst: Path, level: int, threads: int, window_log: int) -> Tuple[Any, Any, Any, str]:
+    """Return (write(chunk), finish() -> (bytes_out, sha), abort(), method) for the best zstd available.
+
+    ``abort()`` releases the compressor (kills the CLI and its drain thread) and closes
+    the output without raising; the caller removes the partial file.
+    """
     try:
         import zstandard as zstd  # type: ignore
 
-        compressor = zstd.ZstdCompressor(level=19)
-        with src.open("rb") as fin, dst.open("wb") as fout:
-            compressor.copy_stream(fin, fout)
-        return True, "python:zstandard"
-    except Exception:
+        params = zstd.ZstdCompressionParameters.from_level(
+            level, threads=threads or -1, window_log=window_log or 0, enable_ldm=bool(window_log)
+        )
+        fout = dst.open("wb")
+        sink = _HashingWriter(fout)
+        writer = zstd.ZstdCompressor(compression_params=params).stream_writer(sink, closefd=False)
+
+        def finish() -> Tuple[int, str]:
+            writer.close()
+            fout.close()
+            return sink.bytes, "0x" + sink.sha.hexdigest()
+
+        def abort() -> None:
+            fout.close()
+
+        return writer.write, finish, abort, "python:zstandard"
+    except ImportError:
         pass
 
     if shutil.which("zstd"):
-        code = os.system(f"zstd -q -19 --force -o {dst.as_posix()} {src.as_posix()}")
-        if code == 0:
-            return True, "cli:zstd"
+        cmd = ["zstd", "-q", f"-{level}", f"-T{threads}", "-c"]
+        if level > 19:
+            cmd.insert(2, "--ultra")
+        if window_log:
+            cmd.append(f"--long={window_log}")
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        fout = dst.open("wb")
+        sink = _HashingWriter(fout)
+        drain_errors: list = []
+
+        def drain() -> None:
+            try:
+                for block in iter(lambda: proc.stdout.read(1024 * 1024), b""):
+                    sink.write(block)
+            except Exception as exc:  # reportado em finish()
+                drain_errors.append(exc)
+
+        drainer = threading.Thread(target=drain, daemon=True)
+        drainer.start()
+
+        def finish() -> Tuple[int, str]:
+            proc.stdin.close()
+            drainer.join()
+            fout.close()
+            if drain_errors:
+                raise drain_errors[0]
+            if proc.wait() != 0:
+                raise RuntimeError(f"zstd exited with {proc.returncode}")
+            return sink.bytes, "0x" + sink.sha.hexdigest()
+
+        def abort() -> None:
+            proc.kill()
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+            drainer.join()
+            proc.wait()
+            proc.stdout.close()
+            fout.close()
+
+        return proc.stdin.write, finish, abort, "cli:zstd"
+
+    return None, None, None, "none"
+
+def stream_snapshot(
+    src: Path,
+    zst_path: Path,
+    level: int = 19,
+    threads: int = 0,
+    window_log: int = 0,
+    bufsize: int = 4 * 1024 * 1024,
+) -> Dict[str, Any]:
+    """Read the snapshot once and fan each chunk out to the raw SHA-256 and the zstd stage.
+
+    Both consumers run in their own threads behind bounded queues (hashlib and zstd
+    release the GIL), the compressor itself is multi-threaded (``threads=0``: all
+    cores) and hashes its output as it is written, so there is one pass over the file.
+    On any error the compressor is torn down and the partial ``.zst`` removed.
+    """
+    write, finish, abort, method = _zstd_sink(zst_path, level, threads or (os.cpu_count() or 1), window_log)
+    raw_sha = hashlib.sha256()
+    stages = [raw_sha.update] + ([write] if write is not None else [])
+    queues = [queue.Queue(maxsize=8) for _ in stages]
+    errors: list = []
+
+    def consume(q: "queue.Queue", fn) -> None:
+        while True:
+            chunk = q.get()
+            if chunk is None:
+                return
+            if not errors:
+                try:
+                    fn(chunk)
+                except Exception as exc:  # reportado após o join
+                    errors.append(exc)
+
+    workers = [threading.Thread(target=consume, args=(q, fn), daemon=True) for q, fn in zip(queues, stages)]
+    for w in workers:
+        w.start()
+    t0 = time.perf_counter()
+    bytes_in = 0
+    done = False
+    try:
+        try:
+            with src.open("rb") as f:
+                for chunk in iter(lambda: f.read(bufsize), b""):
+                    bytes_in += len(chunk)
+                    for q in queues:
+                        q.put(chunk)
+                    if errors:
+                        break
+        finally:
+            for q in queues:
+                q.put(None)
+            for w in workers:
+                w.join()
+        if errors:
+            raise errors[0]
+        bytes_out, zst_sha = finish() if finish is not None else (None, None)
+        done = True
+    finally:
+        if not done and abort is not None:
+            abort()
+            zst_path.unlink(missing_ok=True)
+    seconds = time.perf_counter() - t0
+
+    return {
+        "sqlite_sha256": "0x" + raw_sha.hexdigest(),
+        "sqlite_zst_sha256": zst_sha,
+        "compression": method,
+        "stats": {
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "seconds": round(seconds, 3),
+            "mb_s": round(bytes_in / (1024 * 1024) / max(seconds, 1e-9), 2),
+            "ratio": round(bytes_in / bytes_out, 3) if bytes_out else None,
+            "level": level if finish is not None else None,
+            "threads": (threads or os.cpu_count() or 1) if finish is not None else None,
+            "window_log": window_log or None,
+        },
+    }
+
+def load_shard_manifest(out_dir: Path, chain_id: int) -> Dict[str, Any]:
+    """Load ``shards.json`` and check that every entry links to the previous one."""
+    path = out_dir / SHARD_MANIFEST
+    if not path.exists():
+        return {"chain_id": chain_id, "db_version": 1, "tables": list(SHARD_TABLES), "head": None, "shards": []}
+    manifest = json.loads(path.read_text(encoding="utf-8"))
+    if manifest.get("chain_id") != chain_id:
+        raise RuntimeError(f"{path} is for chain {manifest.get('chain_id')}, not {chain_id}")
+    try:
+        check_shard_chain(manifest)
+    except ValueError as exc:
+        raise RuntimeError(f"{path}: {exc}") from None
+    return manifest
+
+def _shard_ddl(conn: sqlite3.Connection) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """DDL of ``SHARD_TABLES`` (tables, then indexes) and of ``SHARD_FTS`` in the DB attached as ``src``."""
+    placeholders = ", ".join("?" * len(SHARD_TABLES))
+    # Só tabelas e índices: triggers (ex.: sync do FTS) não fazem sentido num shard imutável
+    ddl = conn.execute(
+        f"SELECT type, sql FROM src.sqlite_master WHERE tbl_name IN ({placeholders}) "
+        "AND type IN ('table', 'index') AND sql IS NOT NULL ORDER BY type = 'index'",
+        SHARD_TABLES,
+    ).fetchall()
+    fts_ddl = conn.execute(
+        f"SELECT name, sql FROM src.sqlite_master WHERE type = 'table' "
+        f"AND name IN ({', '.join('?' * len(SHARD_FTS))})",
+        SHARD_FTS,
+    ).fetchall()
+    return ddl, fts_ddl
+
+def build_shard(src: Path, dst: Path, from_block: int, to_block: str, chain_id: int) -> Tuple[int, Dict[str, int]]:
+    """Copy ``SHARD_TABLES`` rows of ``chain_id`` with block_number in [from_block, to] into a new DB.
 
-    return False, "none"
+    Block numbers are per chain, so a multi-chain DB yields one shard chain per
+    chain_id (DBs from before the chain_id column are taken as a single chain).
+
+    The source is attached read-only and read inside one transaction, so the upper
+    bound and the copied rows come from the same view of the DB while the indexer
+    keeps writing. "latest" is the max block_number, capped at the slowest
+    ``indexer_cursor`` of the chain: each deployment has its own cursor, and rows a
+    lagging worker adds below a published bound would never reach a shard.
+    Returns (to_block, row counts).
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(dst.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp.as_uri(), uri=True, isolation_level=None, timeout=30)
+    try:
+        conn.execute("ATTACH DATABASE ? AS src", (src.as_uri() + "?mode=ro",))
+        conn.execute("BEGIN")
+        ddl, fts_ddl = _shard_ddl(conn)
+        chain_filter = {
+            t: "chain_id = :chain AND "
+            if any(row[1] == "chain_id" for row in conn.execute(f"PRAGMA src.table_info({t})"))
+            else ""
+            for t in SHARD_TABLES
+        }
+        params = {"chain": chain_id, "lo": from_block}
+        if to_block == "latest":
+            union = " UNION ALL ".join(
+                f"SELECT MAX(block_number) FROM src.{t} WHERE {chain_filter[t]}1" for t in SHARD_TABLES
+            )
+            upper = max((r[0] for r in conn.execute(union, params) if r[0] is not None), default=from_block - 1)
+            has_cursors = conn.execute(
+                "SELECT 1 FROM src.sqlite_master WHERE type = 'table' AND name = 'indexer_cursor'"
+            ).fetchone()
+            if has_cursors:
+                (safe,) = conn.execute(
+                    "SELECT MIN(last_block) FROM src.indexer_cursor WHERE chain_id = :chain", params
+                ).fetchone()
+                if safe is not None:
+                    upper = min(upper, safe)
+        else:
+            upper = int(to_block)
+        counts: Dict[str, int] = {}
+        if upper >= from_block:
+            for _, sql in ddl:
+                conn.execute(sql)
+            for table in SHARD_TABLES:
+                cur = conn.execute(
+                    f"INSERT INTO main.{table} SELECT * FROM src.{table} "
+                    f"WHERE {chain_filter[table]}block_number BETWEEN :lo AND :hi",
+                    {**params, "hi": upper},
+                )
+                counts[table] = cur.rowcount
+            for name, sql in fts_ddl:
+                conn.execute(sql)
+                conn.execute(f"INSERT INTO main.{name}({name}) VALUES ('rebuild')")
+        conn.execute("COMMIT")
+        conn.execute("DETACH DATABASE src")
+    finally:
+        conn.close()
+
+    if upper < from_block:
+        tmp.unlink(missing_ok=True)
+        return upper, counts
+    compact_snapshot(tmp)
+    os.replace(tmp, dst)
+    return upper, counts
 
 def write_manifest(out_dir: Path, meta: Dict[str, Any]) -> Path:
     path = out_dir / "manifest.json"
     path.write_text(json.dumps(meta, indent=2, sort_keys=True) + "\n", encoding="utf-8")
     return path
 
+def merge_shards(files: List[Path], dst: Path) -> Dict[str, int]:
+    """Fold shard DBs (oldest first) into one new DB and return its row counts.
+
+    The schema comes from the newest shard; rows of older shards are copied by the
+    columns both sides have, so a shard written before a column was added still
+    merges. Shards are attached one at a time, so any number can be folded.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(dst.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp.as_uri(), uri=True, isolation_level=None, timeout=30)
+    counts = {t: 0 for t in SHARD_TABLES}
+    try:
+        conn.execute("ATTACH DATABASE ? AS src", (files[-1].as_uri() + "?mode=ro&immutable=1",))
+        ddl, fts_ddl = _shard_ddl(conn)
+        conn.execute("DETACH DATABASE src")
+        conn.execute("BEGIN")
+        for _, sql in ddl:
+            conn.execute(sql)
+        conn.execute("COMMIT")
+        columns = {t: [r[1] for r in conn.execute(f"PRAGMA main.table_info({t})")] for t in SHARD_TABLES}
+        for shard in files:
+            conn.execute("ATTACH DATABASE ? AS src", (shard.as_uri() + "?mode=ro&immutable=1",))
+            conn.execute("BEGIN")
+            for table in SHARD_TABLES:
+                present = {r[1] for r in conn.execute(f"PRAGMA src.table_info({table})")}
+                cols = ", ".join(c for c in columns[table] if c in present)
+                if not cols:
+                    continue
+                cur = conn.execute(f"INSERT INTO main.{table} ({cols}) SELECT {cols} FROM src.{table}")
+                counts[table] += cur.rowcount
+            conn.execute("COMMIT")
+            conn.execute("DETACH DATABASE src")
+        conn.execute("BEGIN")
+        for name, sql in fts_ddl:
+            conn.execute(sql)
+            conn.execute(f"INSERT INTO main.{name}({name}) VALUES ('rebuild')")
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+    compact_snapshot(tmp)
+    os.replace(tmp, dst)
+    return counts
+
+def _append_shard_entry(
+    args: argparse.Namespace,
+    out_dir: Path,
+    manifest: Dict[str, Any],
+    dst_sqlite: Path,
+    blocks: Dict[str, int],
+    counts: Dict[str, int],
+    timestamp: int,
+    **extra: Any,
+) -> Dict[str, Any]:
+    """Check and compress ``dst_sqlite``, chain its entry after ``head`` and rewrite shards.json."""
+    conn = sqlite3.connect(dst_sqlite.as_posix())
+    try:
+        integrity_checks(conn)
+    finally:
+        conn.close()
+
+    zst_path = dst_sqlite.with_name(dst_sqlite.name + ".zst")
+    streamed = stream_snapshot(dst_sqlite, zst_path, args.zstd_level, args.zstd_threads, args.zstd_window_log)
+    compressed = streamed["sqlite_zst_sha256"] is not None
+    shards = manifest["shards"]
+    entry = {
+        "seq": len(shards),
+        "created_at": timestamp,
+        "blocks": blocks,
+        "sqlite": dst_sqlite.name,
+        "sqlite_sha256": streamed["sqlite_sha256"],
+        "sqlite_zst": zst_path.name if compressed else None,
+        "sqlite_zst_sha256": streamed["sqlite_zst_sha256"],
+        "compression": streamed["compression"],
+        "row_counts": counts,
+        "prev": manifest["head"],
+        **extra,
+    }
+    entry["entry_hash"] = shard_entry_hash(entry)
+    shards.append(entry)
+    manifest.update({"head": entry["entry_hash"], "updated_at": timestamp, "schema": SNAPSHOT_SCHEMA})
+
+    path = out_dir / SHARD_MANIFEST
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+    print(f"shard_sqlite={dst_sqlite}")
+    print(f"shard_blocks={blocks['from']}-{blocks['to']} rows={counts}")
+    print(f"shard_sqlite_sha256={entry['sqlite_sha256']}")
+    if compressed:
+        print(f"shard_sqlite_zst={zst_path}")
+    print(f"shard_head={entry['entry_hash']} shards={len(shards)} live={len(live_shards(shards))}")
+    print(f"manifest={path}")
+    return entry
+
+def rollup_shards(args: argparse.Namespace, out_dir: Path, manifest: Dict[str, Any], timestamp: int) -> None:
+    """Fold the live shards (latest rollup + later shards) into one base shard.
+
+    The base is appended to the same hash chain with ``rollup: {from_seq, to_seq}``;
+    readers attach it instead of the entries it covers, whose files mirrors may delete.
+    """
+    live = live_shards(manifest["shards"])
+    if len(live) < 2:
+        print(f"nothing to roll up (live shards={len(live)})")
+        return
+    blocks = {"from": live[0]["blocks"]["from"], "to": live[-1]["blocks"]["to"]}
+    dst_sqlite = out_dir / f"{args.name_prefix}_{args.chain_id}_base_{blocks['from']}-{blocks['to']}.sqlite"
+    counts = merge_shards([out_dir / e["sqlite"] for e in live], dst_sqlite)
+    _append_shard_entry(
+        args, out_dir, manifest, dst_sqlite, blocks, counts, timestamp,
+        rollup={"from_seq": live[0]["seq"], "to_seq": live[-1]["seq"]},
+    )
+    print(f"rolled_up={live[0]['seq']}..{live[-1]['seq']} superseded={[e['sqlite'] for e in live]}")
+
+def snapshot_shard(args: argparse.Namespace, src: Path, out_dir: Path, timestamp: int) -> int:
+    manifest = load_shard_manifest(out_dir, args.chain_id)
+    shards = manifest["shards"]
+    from_block = shards[-1]["blocks"]["to"] + 1 if shards else int(args.from_block)
+
+    pending = out_dir / f"{args.name_prefix}_{args.chain_id}_shard_pending.sqlite"
+    to_block, counts = build_shard(src, pending, from_block, args.to_block, args.chain_id)
+    if to_block < from_block:
+        print(f"no new blocks since {from_block - 1}; shard chain unchanged (head={manifest['head']})")
+    else:
+        dst_sqlite = out_dir / f"{args.name_prefix}_{args.chain_id}_shard_{from_block}-{to_block}.sqlite"
+        os.replace(pending, dst_sqlite)
+        _append_shard_entry(args, out_dir, manifest, dst_sqlite, {"from": from_block, "to": to_block}, counts, timestamp)
+
+    if args.rollup or 0 < args.max_shards < len(live_shards(shards)):
+        rollup_shards(args, out_dir, manifest, timestamp)
+    return 0
+
 def main() -> int:
     ap = argparse.ArgumentParser(description="Generate a compacted, checksummed SQLite snapshot for MatVerseScan")
     ap.add_argument("--db", required=True, help="Path to source SQLite DB (e.g., .runtime/matversescan.db)")
@@ -97,6 +603,39 @@ def main() -> int:
     ap.add_argument("--from", dest="from_block", default="0", help="First indexed block (default: 0)")
     ap.add_argument("--to", dest="to_block", default="latest", help="Last indexed block (default: latest)")
     ap.add_argument("--name-prefix", default="mvscan", help="Artifact name prefix (default: mvscan)")
+    ap.add_argument(
+        "--method",
+        choices=("backup", "vacuum-into"),
+        default="backup",
+        help="Online copy method; the source DB is never written (default: backup)",
+    )
+    ap.add_argument("--backup-pages", type=int, default=4096, help="Pages copied per backup step (default: 4096)")
+    ap.add_argument(
+        "--backup-sleep",
+        type=float,
+        default=0.005,
+        help="Seconds between backup steps when the source is not in WAL mode (default: 0.005)",
+    )
+    ap.add_argument("--zstd-level", type=int, default=19, help="zstd compression level (default: 19)")
+    ap.add_argument("--zstd-threads", type=int, default=0, help="zstd worker threads, 0 = all cores (default: 0)")
+    ap.add_argument(
+        "--zstd-window-log",
+        type=int,
+        default=0,
+        help="zstd window log for long-distance matching, 0 = level default (default: 0)",
+    )
+    ap.add_argument(
+        "--shards",
+        action="store_true",
+        help="Append an immutable pose/pole shard for the blocks after the last one in shards.json",
+    )
+    ap.add_argument(
+        "--max-shards",
+        type=int,
+        default=4,
+        help="With --shards, fold the live shards into one base shard above this count, 0 = never (default: 4)",
+    )
+    ap.add_argument("--rollup", action="store_true", help="With --shards, fold the live shards into one base shard now")
     args = ap.parse_args()
 
     src = Path(args.db).resolve()
@@ -104,14 +643,14 @@ def main() -> int:
         print(f"error: DB not found: {src}", file=sys.stderr)
         return 2
 
-    optimize_and_vacuum(src)
-
     timestamp = int(time.time())
     out_dir = Path(args.out).resolve()
     out_dir.mkdir(parents=True, exist_ok=True)
+    if args.shards:
+        return snapshot_shard(args, src, out_dir, timestamp)
     base = f"{args.name_prefix}_{args.chain_id}_{args.from_block}-{args.to_block}_{timestamp}"
     dst_sqlite = out_dir / f"{base}.sqlite"
-    copy_db(src, dst_sqlite)
+    snapshot_info = online_snapshot(src, dst_sqlite, args.method, args.backup_pages, args.backup_sleep)
 
     conn = sqlite3.connect(dst_sqlite.as_posix())
     try:
@@ -120,10 +659,10 @@ def main() -> int:
     finally:
         conn.close()
 
-    sha = sha256_file(dst_sqlite)
     zst_path = out_dir / f"{base}.sqlite.zst"
-    compressed, method = maybe_zstd(dst_sqlite, zst_path)
-    zst_sha = sha256_file(zst_path) if compressed else None
+    streamed = stream_snapshot(dst_sqlite, zst_path, args.zstd_level, args.zstd_threads, args.zstd_window_log)
+    sha, zst_sha = streamed["sqlite_sha256"], streamed["sqlite_zst_sha256"]
+    compressed, method = zst_sha is not None, streamed["compression"]
 
     manifest = {
         "created_at": timestamp,
@@ -136,42 +675,22 @@ def main() -> int:
             "sqlite_zst_sha256": zst_sha,
             "compression": method,
         },
+        "pipeline": streamed["stats"],
         "row_counts": counts,
+        "snapshot": snapshot_info,
         "db_version": 1,
-        "schema": {
-            "pose": [
-                "id",
-                "claim_hash",
-                "submitter",
-                "metadata_uri",
-                "proof_hash",
-                "block_number",
-                "tx_hash",
-                "timestamp",
-            ],
-            "pole": [
-                "claim_hash",
-                "run_hash",
-                "submitter",
-                "verdict",
-                "omega_u6",
-                "psi_u6",
-                "cvar_u6",
-                "latency_ms",
-                "block_number",
-                "tx_hash",
-                "timestamp",
-            ],
-            "pole_pk": ["claim_hash", "run_hash"],
-        },
+        "schema": SNAPSHOT_SCHEMA,
     }
     manifest_path = write_manifest(out_dir, manifest)
 
     print(f"snapshot_sqlite={dst_sqlite}")
     print(f"snapshot_sqlite_sha256={sha}")
+    print(f"snapshot_copy_seconds={snapshot_info['copy_seconds']} method={snapshot_info['method']}")
     if compressed:
         print(f"snapshot_sqlite_zst={zst_path}")
         print(f"snapshot_sqlite_zst_sha256={zst_sha}")
+    stats = streamed["stats"]
+    print(f"pipeline_mb_s={stats['mb_s']} ratio={stats['ratio']} seconds={stats['seconds']}")
     print(f"manifest={manifest_path}")
     return 0
 
@@ -11,8 +11,13 @@ fi
 CLAIM_HASH=$(tr -d '\n\r ' < "$CLAIM_HASH_FILE")
 export CLAIM_HASH
 
-# Simula uma execução determinística local e métricas
-python3 bench/run_bench.py --out .runtime/bench_out.json
+# Simula uma execução determinística local e métricas.
+# BENCH_TARGET (comando) liga o harness de timing: latency_ms passa a ser a mediana medida.
+TIMING_ARGS=()
+if [ -n "${BENCH_TARGET:-}" ]; then
+  TIMING_ARGS=(--target "$BENCH_TARGET" --repeat "${BENCH_REPEAT:-30}" --warmup "${BENCH_WARMUP:-3}")
+fi
+python3 bench/run_bench.py --out .runtime/bench_out.json "${TIMING_ARGS[@]}"
 
 # Lê métricas e envia on-chain
 python3 - <<PY
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Verify recorded PoLE runs against reference values and claim tolerances.
+
+Steps performed:
+- Load every `pole` row (optionally restricted to some claims/one chain) into column arrays.
+- Resolve per-claim reference values: explicit ones from --reference, otherwise the
+  per-claim median of the recorded runs (i.e. agreement with the consensus run).
+  Each chain is verified on its own: a claim is grouped per (chain_id, claim_hash).
+- Check |value - reference| <= tolerance for omega, psi, cvar and latency_ms in one
+  vectorized pass and derive per-claim reproducibility scores.
+- Write `pole_verification` (per run) and `claim_reproducibility` (per claim) tables
+  into the same SQLite DB, where MatVerseScan shows them like any other table.
+"""
+import argparse
+import json
+import pathlib
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+# métrica -> (coluna em pole, escala para unidades do claim, chave em tolerances.json)
+METRICS = {
+    "omega": ("omega_u6", 1e6, "omega_abs"),
+    "psi": ("psi_u6", 1e6, "psi_abs"),
+    "cvar": ("cvar_u6", 1e6, "cvar_abs"),
+    "latency_ms": ("latency_ms", 1.0, "latency_ms_abs"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pole_verification (
+    claim_hash TEXT NOT NULL,
+    run_hash TEXT NOT NULL,
+    chain_id INTEGER NOT NULL,
+    contract TEXT NOT NULL,
+    omega_ok INTEGER NOT NULL,
+    psi_ok INTEGER NOT NULL,
+    cvar_ok INTEGER NOT NULL,
+    latency_ok INTEGER NOT NULL,
+    pass INTEGER NOT NULL,
+    verified_at INTEGER NOT NULL,
+    PRIMARY KEY (claim_hash, run_hash, chain_id)
+);
+CREATE TABLE IF NOT EXISTS claim_reproducibility (
+    claim_hash TEXT NOT NULL,
+    chain_id INTEGER NOT NULL,
+    runs INTEGER NOT NULL,
+    passed INTEGER NOT NULL,
+    score REAL NOT NULL,
+    reference_source TEXT NOT NULL,
+    ref_omega REAL,
+    ref_psi REAL,
+    ref_cvar REAL,
+    ref_latency_ms REAL,
+    verified_at INTEGER NOT NULL,
+    PRIMARY KEY (claim_hash, chain_id)
+);
+"""
+RESULT_TABLES = ("pole_verification", "claim_reproducibility")
+
+
+def load_runs(
+    conn: sqlite3.Connection, claims: list[str] | None, chain_id: int | None = None
+) -> tuple[list[tuple[int, str]], np.ndarray, dict, dict]:
+    """Carrega as runs na ordem da PK (claim_hash, run_hash, chain_id, contract), sem sort no SQLite.
+
+    Uma run registrada em vários deployments da mesma chain conta uma vez: com
+    ``MIN(contract)`` o SQLite tira as colunas da cópia de menor contract, então a
+    escolha é determinística. Um sort estável por chain_id (em numpy) deixa as runs
+    agrupadas por (chain_id, claim_hash); o código de cada grupo sai de um ``cumsum``
+    das fronteiras entre blocos. Devolve (grupos, códigos, colunas da run, métricas).
+    """
+    cols = ", ".join(col for col, _, _ in METRICS.values())
+    sql = f"SELECT claim_hash, run_hash, chain_id, MIN(contract), {cols} FROM pole"
+    where: list[str] = []
+    params: list = []
+    if claims:
+        where.append(f"claim_hash IN ({', '.join('?' * len(claims))})")
+        params.extend(claims)
+    if chain_id is not None:
+        where.append("chain_id = ?")
+        params.append(chain_id)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    # ORDER BY fixa a ordem (o índice da PK já a entrega, então não há sort extra)
+    rows = conn.execute(
+        sql + " GROUP BY claim_hash, run_hash, chain_id ORDER BY claim_hash, run_hash, chain_id", params
+    ).fetchall()
+    if not rows:
+        return [], np.empty(0, dtype=np.int64), {}, {}
+    claim_hash, run_hash, chain, contract, *values = zip(*rows)
+
+    chain = np.asarray(chain, dtype=np.int64)
+    order = np.argsort(chain, kind="stable")
+    chain = chain[order]
+    claim_hash = np.asarray(claim_hash, dtype=object)[order]
+    boundary = (claim_hash[1:] != claim_hash[:-1]) | (chain[1:] != chain[:-1])
+    codes = np.concatenate(([0], np.cumsum(boundary, dtype=np.int64)))
+    first = np.concatenate(([True], boundary))
+    groups = list(zip(chain[first].tolist(), claim_hash[first].tolist()))
+
+    runs = {
+        "run_hash": np.asarray(run_hash, dtype=object)[order],
+        "chain_id": chain,
+        "contract": np.asarray(contract, dtype=object)[order],
+    }
+    arrays = {
+        metric: np.asarray(vals, dtype=np.float64)[order] / scale
+        for (metric, (_, scale, _)), vals in zip(METRICS.items(), values)
+    }
+    return groups, codes, runs, arrays
+
+
+def ensure_result_tables(conn: sqlite3.Connection) -> None:
+    # Tabelas de antes do chain_id: são derivadas de pole, então são recriadas
+    for table in RESULT_TABLES:
+        cols = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if cols and "chain_id" not in cols:
+            conn.execute(f"DROP TABLE {table}")
+    conn.executescript(SCHEMA)
+
+
+def group_median(codes: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """Mediana por grupo sem loop Python: ordena por (grupo, valor) e indexa o meio de cada bloco."""
+    order = np.lexsort((values, codes))
+    sorted_vals = values[order]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    lo = starts + (counts - 1) // 2
+    hi = starts + counts // 2
+    return (sorted_vals[lo] + sorted_vals[hi]) / 2.0
+
+
+def verify(
+    claims: list[tuple[int, str]],
+    codes: np.ndarray,
+    arrays: dict,
+    tolerances: dict,
+    references: dict,
+) -> dict:
+    n = len(claims)
+
+    ref_source = np.array(["median"] * n, dtype=object)
+    refs = {}
+    tols = {}
+    for metric, (_, _, tol_key) in METRICS.items():
+        ref = group_median(codes, arrays[metric], n)
+        tol = np.full(n, float(tolerances.get(tol_key, np.inf)))
+        # Overrides explícitos por claim (poucos claims; o volume está nas runs)
+        for i, (_, claim) in enumerate(claims):
+            spec = references.get(claim)
+            if not spec:
+                continue
+            if metric in spec:
+                ref[i] = float(spec[metric])
+                ref_source[i] = "reference"
+            if tol_key in spec.get("tolerances", {}):
+                tol[i] = float(spec["tolerances"][tol_key])
+        refs[metric] = ref
+        tols[metric] = tol
+
+    ok = {
+        metric: np.abs(arrays[metric] - refs[metric][codes]) <= tols[metric][codes]
+        for metric in METRICS
+    }
+    passed = np.logical_and.reduce(list(ok.values()))
+    runs = np.bincount(codes, minlength=n)
+    passed_per_claim = np.bincount(codes, weights=passed, minlength=n).astype(np.int64)
+
+    return {
+        "claims": claims,
+        "codes": codes,
+        "ok": ok,
+        "pass": passed,
+        "runs": runs,
+        "passed": passed_per_claim,
+        "score": passed_per_claim / np.maximum(runs, 1),
+        "refs": refs,
+        "ref_source": ref_source,
+    }
+
+
+def write_results(conn: sqlite3.Connection, runs: dict, res: dict) -> None:
+    now = int(time.time())
+    groups = res["claims"]
+    chains, claims = zip(*groups)
+    claim_hash = np.asarray(claims, dtype=object)[res["codes"]]
+    ok = {m: res["ok"][m].astype(np.int64).tolist() for m in METRICS}
+    with conn:
+        ensure_result_tables(conn)
+        for table in RESULT_TABLES:
+            conn.executemany(f"DELETE FROM {table} WHERE claim_hash = ? AND chain_id = ?", zip(claims, chains))
+        conn.executemany(
+            "INSERT INTO pole_verification "
+            "(claim_hash, run_hash, chain_id, contract, omega_ok, psi_ok, cvar_ok, latency_ok, pass, verified_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            zip(
+                claim_hash.tolist(),
+                runs["run_hash"].tolist(),
+                runs["chain_id"].tolist(),
+                runs["contract"].tolist(),
+                ok["omega"],
+                ok["psi"],
+                ok["cvar"],
+                ok["latency_ms"],
+                res["pass"].astype(np.int64).tolist(),
+                [now] * len(claim_hash),
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO claim_reproducibility "
+            "(claim_hash, chain_id, runs, passed, score, reference_source, ref_omega, ref_psi, ref_cvar, "
+            "ref_latency_ms, verified_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            zip(
+                claims,
+                chains,
+                res["runs"].tolist(),
+                res["passed"].tolist(),
+                res["score"].tolist(),
+                res["ref_source"].tolist(),
+                res["refs"]["omega"].tolist(),
+                res["refs"]["psi"].tolist(),
+                res["refs"]["cvar"].tolist(),
+                res["refs"]["latency_ms"].tolist(),
+                [now] * len(groups),
+            ),
+        )
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Verify PoLE runs against claim tolerances")
+    ap.add_argument("--db", required=True, help="Path to the indexed SQLite DB")
+    ap.add_argument("--tolerances", default="spec/tolerances.example.json", help="Default tolerances JSON")
+    ap.add_argument(
+        "--reference",
+        default=None,
+        help="Optional JSON {claim_hash: {omega, psi, cvar, latency_ms, tolerances: {...}}}",
+    )
+    ap.add_argument("--claim", action="append", default=None, help="Restrict to a claim hash (repeatable)")
+    ap.add_argument("--chain-id", type=int, default=None, help="Only verify runs recorded on this chain (default: every chain, separately)")
+    args = ap.parse_args()
+
+    tolerances = json.loads(pathlib.Path(args.tolerances).read_text(encoding="utf-8"))
+    references = {}
+    if args.reference:
+        references = json.loads(pathlib.Path(args.reference).read_text(encoding="utf-8"))
+
+    conn = sqlite3.connect(args.db)
+    try:
+        t0 = time.perf_counter()
+        claims, codes, runs, arrays = load_runs(conn, args.claim, args.chain_id)
+        if len(codes) == 0:
+            print("no pole rows to verify", file=sys.stderr)
+            return 1
+        t1 = time.perf_counter()
+        res = verify(claims, codes, arrays, tolerances, references)
+        t2 = time.perf_counter()
+        write_results(conn, runs, res)
+        t3 = time.perf_counter()
+    finally:
+        conn.close()
+
+    chains = len({chain for chain, _ in res["claims"]})
+    print(f"runs={len(codes)} claims={len(res['claims'])} chains={chains} passed={int(res['pass'].sum())}")
+    print(f"load_s={t1 - t0:.3f} verify_s={t2 - t1:.3f} write_s={t3 - t2:.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
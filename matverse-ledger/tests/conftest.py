@@ -0,0 +1,9 @@
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+# Mesmo layout dos entrypoints: raiz (scan importa capt/scripts) + módulos planos de scripts/ e scan/
+for path in (ROOT, ROOT / "scripts", ROOT / "scan"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,66 @@
+"""Streaming canonical hashes must match the one-shot ``json.dumps`` canonicalization byte for byte."""
+import hashlib
+import json
+
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from canonical_json import canonical_bytes, canonical_sha256
+
+# Sem surrogates soltos: não são codificáveis em UTF-8 em nenhum dos dois caminhos
+TEXT = st.text(alphabet=st.characters(exclude_categories=("Cs",)), max_size=40)
+SCALARS = (
+    st.none()
+    | st.booleans()
+    | st.integers()
+    | st.integers(min_value=-(2**256), max_value=2**256)
+    | st.floats()
+    | TEXT
+)
+JSON = st.recursive(
+    SCALARS,
+    lambda children: st.lists(children, max_size=8) | st.dictionaries(TEXT, children, max_size=8),
+    max_leaves=60,
+)
+
+
+def reference_bytes(obj, ensure_ascii: bool) -> bytes:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=ensure_ascii).encode("utf-8")
+
+
+@settings(max_examples=300)
+@given(obj=st.dictionaries(TEXT, JSON, max_size=8), ensure_ascii=st.booleans(), chunk_chars=st.sampled_from([1, 7, 1 << 16]))
+def test_streaming_hash_matches_one_shot(obj, ensure_ascii, chunk_chars):
+    expected = reference_bytes(obj, ensure_ascii)
+    assert canonical_bytes(obj, ensure_ascii) == expected
+    assert canonical_sha256(obj, ensure_ascii, chunk_chars) == hashlib.sha256(expected).hexdigest()
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_non_ascii_big_ints_and_floats(ensure_ascii):
+    obj = {
+        "ação": ["Ω", "Ψ", "日本語", "emoji \U0001f9ea"],
+        "big": [2**200, -(2**130), 10**40 + 1],
+        "floats": [0.1, -0.0, 1e-300, 1.7976931348623157e308, 5e-324],
+        "M": [[i * 0.001 + j for j in range(50)] for i in range(50)],
+    }
+    expected = reference_bytes(obj, ensure_ascii)
+    assert canonical_sha256(obj, ensure_ascii, chunk_chars=1024) == hashlib.sha256(expected).hexdigest()
+
+
+@settings(max_examples=100)
+@given(obj=st.dictionaries(TEXT, JSON, max_size=8))
+def test_compile_claim_hash_unchanged(obj):
+    compile_claim = pytest.importorskip("compile_claim")
+    expected = hashlib.sha256(reference_bytes(obj, ensure_ascii=True)).hexdigest()
+    assert compile_claim.canonical_sha256(obj) == expected
+
+
+@settings(max_examples=100)
+@given(obj=st.dictionaries(TEXT, JSON, max_size=8))
+def test_core_h_m_unchanged(obj):
+    benchmarks_core = pytest.importorskip("benchmarks_core")
+    expected = hashlib.sha256(reference_bytes(obj, ensure_ascii=False)).hexdigest()
+    assert benchmarks_core.canon_sha256_hex(obj) == expected
+    assert benchmarks_core.canon_bytes(obj) == reference_bytes(obj, ensure_ascii=False)
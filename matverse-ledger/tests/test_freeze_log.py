@@ -0,0 +1,101 @@
+"""Recibos do log durável só saem após o commit: um crash não pode reemitir um ``seq`` com outro hash."""
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+
+import pytest
+
+from capt.measurement.freeze_log import DurableBenchmarkFreezeStore, FreezeStoreUnavailable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Filho: recebe recibos, enfileira mais congelamentos sem esperar e morre sem shutdown
+CRASHING_WRITER = textwrap.dedent(
+    """
+    import json, os, sys, threading
+    sys.path.insert(0, {root!r})
+    from capt.measurement.freeze_log import DurableBenchmarkFreezeStore
+
+    store = DurableBenchmarkFreezeStore({path!r}, commit_interval=0.2)
+    receipts = [r for i in range(3) for r in store.freeze_many([{{"run": i, "k": j}} for j in range(50)])]
+    for i in range(4):
+        threading.Thread(target=store.freeze_many, args=([{{"late": i}}] * 100,), daemon=True).start()
+    print(json.dumps([(r["seq"], r["hash"]) for r in receipts]), flush=True)
+    os._exit(0)
+    """
+)
+
+
+def test_receipts_survive_crash_and_restart(tmp_path):
+    path = str(tmp_path / "freezes.db")
+    out = subprocess.run(
+        [sys.executable, "-c", CRASHING_WRITER.format(root=ROOT, path=path)],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    receipts = json.loads(out.stdout)
+    assert [seq for seq, _ in receipts] == list(range(1, 151))
+
+    store = DurableBenchmarkFreezeStore(path)
+    try:
+        committed = {r["seq"]: r["hash"] for r in store.query(limit=1000)}
+        for seq, digest in receipts:
+            assert committed[seq] == digest
+        assert store.verify_chain()["ok"]
+
+        last_seq = max(committed)
+        record = store.freeze({"after": "restart"})
+        assert record["seq"] == last_seq + 1
+        assert record["prev_hash"] == committed[last_seq]
+        assert store.verify_chain()["ok"]
+    finally:
+        store.close()
+
+
+def test_concurrent_requests_share_commits(tmp_path):
+    store = DurableBenchmarkFreezeStore(str(tmp_path / "freezes.db"), commit_interval=0.05)
+    results: list[dict] = []
+
+    def worker(i: int) -> None:
+        results.extend(store.freeze_many([{"worker": i, "k": k} for k in range(20)]))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    try:
+        # Todo recibo devolvido já é visível numa leitura direta, sem esperar a fila
+        assert sorted(r["seq"] for r in results) == list(range(1, 161))
+        assert len(store.query(limit=1000)) == 160
+        assert store.verify_chain() == {"ok": True, "checked": 160, "first_bad_seq": None}
+        assert store.query(key="worker", value="3", limit=1000)[0]["payload"]["worker"] == 3
+    finally:
+        store.close()
+    with pytest.raises(FreezeStoreUnavailable):
+        store.freeze({"after": "close"})
+
+
+def test_compact_keeps_chain_anchored(tmp_path):
+    path = str(tmp_path / "freezes.db")
+    store = DurableBenchmarkFreezeStore(path)
+    old = store.freeze_many([{"i": i} for i in range(10)])
+    cutoff = old[-1]["timestamp"] + 1e-6
+    store.freeze_many([{"i": i} for i in range(10, 15)])
+    assert store.compact(cutoff) == 10
+    assert store.verify_chain() == {"ok": True, "checked": 5, "first_bad_seq": None}
+    store.close()
+
+    # Com retenção, a escritora compacta sozinha ao subir
+    store = DurableBenchmarkFreezeStore(path, retention=0.0)
+    store.start()
+    store.close()
+    assert store.status()["last_compaction"]["removed"] == 5
+    reopened = DurableBenchmarkFreezeStore(path)
+    assert reopened.freeze({})["seq"] == 16
+    assert reopened.verify_chain() == {"ok": True, "checked": 1, "first_bad_seq": None}
+    reopened.close()
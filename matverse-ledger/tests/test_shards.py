@@ -0,0 +1,73 @@
+"""Rollup de shards: a cadeia continua íntegra e o scan anexa só os shards vivos."""
+import argparse
+import json
+import sqlite3
+
+from shard_db import ShardSet
+from shard_manifest import live_shards, shard_entry_hash
+from snapshot_sqlite import snapshot_shard
+
+SOURCE_SCHEMA = """
+CREATE TABLE pose (id INTEGER PRIMARY KEY, claim_hash TEXT, metadata_uri TEXT, block_number INTEGER,
+                   chain_id INTEGER, contract TEXT);
+CREATE TABLE pole (claim_hash TEXT, run_hash TEXT, block_number INTEGER, chain_id INTEGER, contract TEXT,
+                   PRIMARY KEY (claim_hash, run_hash, chain_id, contract));
+CREATE VIRTUAL TABLE pose_fts USING fts5(metadata_uri, content='pose', content_rowid='id');
+"""
+
+
+def _args(out, **kw):
+    defaults = dict(
+        chain_id=1, from_block="0", to_block="latest", name_prefix="t", zstd_level=1,
+        zstd_threads=1, zstd_window_log=0, max_shards=2, rollup=False,
+    )
+    return argparse.Namespace(out=str(out), **{**defaults, **kw})
+
+
+def _add_blocks(db, blocks):
+    conn = sqlite3.connect(db)
+    for blk in blocks:
+        conn.execute(
+            "INSERT INTO pose (claim_hash, metadata_uri, block_number, chain_id, contract) VALUES (?, ?, ?, 1, 'c')",
+            (f"c{blk}", f"https://huggingface.co/m{blk}", blk),
+        )
+        conn.execute("INSERT INTO pole VALUES (?, ?, ?, 1, 'c')", (f"c{blk}", f"r{blk}", blk))
+    conn.commit()
+    conn.close()
+
+
+def test_rollup_bounds_attached_shards(tmp_path):
+    src, out = tmp_path / "src.db", tmp_path / "dist"
+    out.mkdir()
+    conn = sqlite3.connect(src)
+    conn.executescript(SOURCE_SCHEMA)
+    conn.close()
+
+    for run in range(7):
+        _add_blocks(src, range(run * 10, run * 10 + 3))
+        snapshot_shard(_args(out), src, out, timestamp=run)
+
+    manifest = json.loads((out / "shards.json").read_text())
+    entries = manifest["shards"]
+    assert all(shard_entry_hash(e) == e["entry_hash"] for e in entries)
+    live = live_shards(entries)
+    assert len(live) <= 2 and live[0]["rollup"]
+
+    shard_set = ShardSet.load([out / "shards.json"], verify_files=True)
+    assert len(shard_set.files) == len(live)
+    conn = sqlite3.connect(":memory:")
+    shard_set.attach(conn)
+    assert conn.execute("SELECT COUNT(*), COUNT(DISTINCT block_number) FROM pole").fetchone() == (21, 21)
+    assert conn.execute("SELECT COUNT(*) FROM pose").fetchone() == (21,)
+
+    # --rollup funde na hora; arquivos cobertos pelo rollup não precisam mais existir
+    snapshot_shard(_args(out, rollup=True), src, out, timestamp=99)
+    entries = json.loads((out / "shards.json").read_text())["shards"]
+    assert len(live_shards(entries)) == 1
+    for entry in entries[:-1]:
+        (out / entry["sqlite"]).unlink(missing_ok=True)
+    base = ShardSet.load([out / "shards.json"], verify_files=True)
+    conn = sqlite3.connect(":memory:")
+    base.attach(conn)
+    assert conn.execute("SELECT COUNT(*) FROM pose").fetchone() == (21,)
+    assert conn.execute("SELECT COUNT(*) FROM shard_0.pose_fts WHERE pose_fts MATCH 'huggingface'").fetchone() == (21,)